@@ -0,0 +1,79 @@
+# Crash-safe journal for the basket being built. Every change is appended as a
+# short text record, and the file is replayed on start-up to bring the basket
+# back after a crash or a terminal restart:
+#     S <item_id> <qty>     set the item's quantity (0 removes the line)
+#     C                     clear the basket
+# Every compact_every records the journal is rewritten as a snapshot of the
+# current basket (atomic replace), so it never grows much beyond that.
+import os
+
+JOURNAL_PATH = "basket.journal"
+
+
+class BasketJournal:
+    def __init__(self, path=JOURNAL_PATH, compact_every=200, sync=False):
+        self.path = path
+        self.compact_every = compact_every
+        self.sync = sync                # fsync every record (survives power loss, slower)
+        self.records_since_snapshot = 0
+        self._file = None
+
+    def replay(self):
+        """Read the journal and return the basket it describes as {item_id: qty}."""
+        basket = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as journal:
+                for line in journal:
+                    if not line.endswith("\n"):
+                        break       # torn last write from a crash: ignore it
+                    parts = line.split()
+                    try:
+                        if parts[0] == "S":
+                            item_id, qty = int(parts[1]), int(parts[2])
+                            if qty > 0:
+                                basket[item_id] = qty
+                            else:
+                                basket.pop(item_id, None)
+                        elif parts[0] == "C":
+                            basket.clear()
+                    except (IndexError, ValueError):
+                        continue    # skip a damaged record, keep the rest
+                    self.records_since_snapshot += 1
+        except FileNotFoundError:
+            pass
+        return basket
+
+    def _append(self, record):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(record)
+        self._file.flush()          # in the OS once flushed, so an app crash can't lose it
+        if self.sync:
+            os.fsync(self._file.fileno())
+        self.records_since_snapshot += 1
+
+    def record_set(self, item_id, qty):
+        self._append(f"S {item_id} {qty}\n")
+
+    def record_clear(self):
+        self._append("C\n")
+
+    def needs_compaction(self):
+        return self.records_since_snapshot >= self.compact_every
+
+    def compact(self, basket):
+        """Replace the journal with a snapshot of basket ({item_id: qty})."""
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as snapshot:
+            for item_id, qty in basket.items():
+                snapshot.write(f"S {item_id} {qty}\n")
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        self.close()
+        os.replace(tmp_path, self.path)
+        self.records_since_snapshot = len(basket)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,262 @@
+# Micro-benchmarks for the order-engine hot paths: add_to_order,
+# update_item_quantity, get_item_quantity, get_order_summary, writing an
+# orders.csv row (as OrderWriter does for submit_order) and the credential
+# lookup behind login. Each runs at menu sizes 9, 500 and 5,000 items and
+# basket sizes of 1 to 200 lines (capped at the menu size).
+# Run from the "Iteration 3" folder:
+#     python benchmarks/bench_engine.py --save baselines/1.4.json
+#     python benchmarks/bench_engine.py --compare baselines/1.4.json
+# --compare exits with status 1 if any case is slower than the baseline by
+# more than --tolerance, so it can gate a release. Only compare baselines
+# taken on the same machine, with nothing else busy on it.
+import argparse
+import csv
+import fnmatch
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from credentials import CredentialStore
+from order_writer import csv_row
+from takeaway_engine import MenuItem, TakeawayApp, MAX_ITEM_QTY
+
+MENU_SIZES = (9, 500, 5000)
+ORDER_SIZES = (1, 10, 50, 200)
+USERS = 1000            # accounts in the credential store
+MIN_OPS = 20000         # operations per timed run, so short calls still time reliably
+
+
+def make_menu(size):
+    """The standard 9-item menu, padded out with generated items to `size`."""
+    app = TakeawayApp()
+    for n in range(len(app.items_by_id), size):
+        item_id = 1000 + n
+        app.add_menu_item(f"Category {n % 25}",
+                          MenuItem(item_id, f"Item {item_id}", 1 + (n % 40) / 4))
+    return app
+
+
+def make_basket(app, lines):
+    """A basket sharing app's menu with `lines` lines of qty 1."""
+    basket = TakeawayApp(catalog=app)
+    for item_id in list(app.items_by_id)[:lines]:
+        basket.add_to_order(item_id, 1)
+    return basket
+
+
+def best_time(prepare, run, ops, repeat):
+    """Best seconds per operation over `repeat` runs; prepare() is not timed."""
+    best = float("inf")
+    for _ in range(repeat):
+        state = prepare()
+        start = timeit.default_timer()
+        run(state)
+        best = min(best, timeit.default_timer() - start)
+    return best / ops
+
+
+# ---------------- cases ----------------
+def bench_add_to_order(app, lines, repeat):
+    # Fill baskets already holding lines-1 lines: each line goes 1 -> 10 and one new line 0 -> 9
+    item_ids = list(app.items_by_id)[:lines]
+    per_basket = lines * (MAX_ITEM_QTY - 1)
+    baskets = -(-MIN_OPS // per_basket)
+
+    def prepare():
+        return [make_basket(app, lines - 1) for _ in range(baskets)]
+
+    def run(state):
+        for basket in state:
+            add = basket.add_to_order
+            for _ in range(MAX_ITEM_QTY - 1):
+                for item_id in item_ids:
+                    add(item_id, 1)
+
+    return best_time(prepare, run, baskets * per_basket, repeat)
+
+
+def bench_update_item_quantity(app, lines, repeat):
+    names = [line[0] for line in make_basket(app, lines).order]
+    rounds = -(-MIN_OPS // lines)
+
+    def run(basket):
+        update = basket.update_item_quantity
+        for n in range(rounds):
+            qty = 2 + n % 2
+            for name in names:
+                update(name, qty)
+
+    return best_time(lambda: make_basket(app, lines), run, rounds * lines, repeat)
+
+
+def bench_get_item_quantity(app, lines, repeat):
+    basket = make_basket(app, lines)
+    # Alternate between items in the basket and items from the end of the menu (usually not in it)
+    item_ids = list(app.items_by_id)
+    probes = [item_ids[n % lines] if n % 2 else item_ids[-1 - n % len(item_ids)]
+              for n in range(MIN_OPS)]
+
+    def run(state):
+        get = basket.get_item_quantity
+        for item_id in probes:
+            get(item_id)
+
+    return best_time(lambda: None, run, len(probes), repeat)
+
+
+def bench_get_order_summary(app, lines, repeat):
+    basket = make_basket(app, lines)
+    calls = max(500, MIN_OPS // lines)
+
+    def run(state):
+        for _ in range(calls):
+            basket.get_order_summary()
+
+    return best_time(lambda: None, run, calls, repeat)
+
+
+def bench_csv_row(app, lines, repeat):
+    # The per-order part of OrderWriter._append_csv: format the row and write it
+    order = make_basket(app, lines).build_order(delivery=True, placed_at=datetime(2025, 10, 17, 19, 30))
+    calls = max(500, MIN_OPS // lines)
+
+    def run(state):
+        writer = csv.writer(io.StringIO())
+        for _ in range(calls):
+            writer.writerow(csv_row(order))
+
+    return best_time(lambda: None, run, calls, repeat)
+
+
+def bench_credential_lookup(store, repeat):
+    usernames = [f"user{n:05d}" for n in range(0, USERS, max(1, USERS // 100))]
+    usernames.append("nobody")      # a miss, as for a mistyped username
+    rounds = -(-MIN_OPS // len(usernames))
+
+    def run(state):
+        get_record = store.get_record
+        for _ in range(rounds):
+            for username in usernames:
+                get_record(username)
+
+    return best_time(lambda: None, run, rounds * len(usernames), repeat)
+
+
+def bench_login_check(store, repeat):
+    # get_record + verify for a user who logged in recently (the verifier's cache),
+    # which is the common case at a kiosk; a full hash is measured in bench_passwords.py
+    record = store.get_record("user00000")
+    store.verify("user00000", "password0", record)
+    calls = MIN_OPS // 4
+
+    def run(state):
+        for _ in range(calls):
+            store.verify("user00000", "password0", store.get_record("user00000"))
+
+    return best_time(lambda: None, run, calls, repeat)
+
+
+ENGINE_CASES = (
+    ("add_to_order", bench_add_to_order),
+    ("update_item_quantity", bench_update_item_quantity),
+    ("get_item_quantity", bench_get_item_quantity),
+    ("get_order_summary", bench_get_order_summary),
+    ("csv_row_write", bench_csv_row),
+)
+
+
+def run_all(repeat, only=None):
+    """Returns {case name: seconds per operation}."""
+    results = {}
+
+    def record(name, func, *args):
+        if only and not fnmatch.fnmatchcase(name, only.replace("[", "[[]")):
+            return
+        results[name] = func(*args, repeat)
+        print(f"{name:<50}{results[name] * 1e6:12.3f} us")
+
+    for menu_size in MENU_SIZES:
+        app = make_menu(menu_size)
+        for lines in sorted({min(lines, menu_size) for lines in ORDER_SIZES}):
+            for case, func in ENGINE_CASES:
+                record(f"{case}[menu={menu_size},lines={lines}]", func, app, lines)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        store = CredentialStore(os.path.join(workdir, "users.db"))
+        # Cheap placeholder records: the lookup cost doesn't depend on the hash
+        with store.conn:
+            store.conn.executemany(
+                "INSERT INTO users (username, password) VALUES (?, ?)",
+                ((f"user{n:05d}", "x") for n in range(1, USERS)))
+        store.add_user("user00000", "password0")
+        record(f"credential_lookup[users={USERS}]", bench_credential_lookup, store)
+        record("login_check_cached", bench_login_check, store)
+        store.conn.close()
+    return results
+
+
+# ---------------- baselines ----------------
+def save_baseline(path, results):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    baseline = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} {platform.processor()}".strip(),
+        "unit": "seconds per operation",
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+    print(f"baseline saved to {path}")
+
+
+def compare(path, results, tolerance):
+    """Print each case against the baseline. Returns the names of regressed cases."""
+    with open(path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\ncompared with {path} (python {baseline.get('python')}, {baseline.get('created')})")
+    regressed = []
+    for name, seconds in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<50}{'new':>12}")
+            continue
+        change = seconds / before - 1
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            regressed.append(name)
+        print(f"{name:<50}{change:>+12.1%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Order-engine micro-benchmarks.")
+    parser.add_argument("--repeat", type=int, default=7, help="runs per case; the best is kept")
+    parser.add_argument("--only", metavar="PATTERN",
+                        help="only run cases matching this, e.g. 'add_to_order[menu=500,*'")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.20,
+                        help="slowdown counted as a regression (default: %(default)s = 20%%)")
+    args = parser.parse_args()
+
+    results = run_all(args.repeat, args.only)
+    if args.save:
+        save_baseline(args.save, results)
+    if args.compare:
+        regressed = compare(args.compare, results, args.tolerance)
+        if regressed:
+            print(f"\n{len(regressed)} case(s) slower than the baseline by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Compares the old float price path with the integer-cent path used by the
+# order ledger. Run from the "Iteration 3" folder:
+#     python benchmarks/bench_money.py
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from takeaway_engine import OrderLedger
+from money import to_cents, format_money
+
+PRICES = [8.50, 12.00, 11.00, 4.00, 5.00, 3.50, 2.50, 3.00, 3.50]
+PRICES_CENTS = [to_cents(p) for p in PRICES]
+CLICKS = 1000   # +/- clicks simulated per run
+
+
+def click_session(prices):
+    """Simulate a basket being built with +/- clicks, then formatted for display."""
+    ledger = OrderLedger()
+    for click in range(CLICKS):
+        item_id = click % len(prices)
+        qty = click % 10 + 1
+        ledger.set_line(item_id, "item", qty, prices[item_id] * qty)
+    return ledger.subtotal
+
+
+def run_float():
+    return f"{click_session(PRICES):.2f}"
+
+
+def run_cents():
+    return format_money(click_session(PRICES_CENTS))
+
+
+def main(repeat=5, number=200):
+    results = {}
+    for label, func in (("float", run_float), ("cents", run_cents)):
+        best = min(timeit.repeat(func, repeat=repeat, number=number))
+        results[label] = best
+        print(f"{label:>6}: {best / number * 1e6:8.1f} us per {CLICKS} clicks")
+
+    print(f"float total: {run_float()}   cents total: {run_cents()}")
+    ratio = results["float"] / results["cents"]
+    print(f"cents path is {ratio:.2f}x the speed of the float path")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Throughput of the "Items Ordered" parser in order_lines.py, in order lines
+# (entries like "2x Burger") per second. Run from the "Iteration 3" folder:
+#     python benchmarks/bench_order_lines.py
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from takeaway_engine import TakeawayApp
+from order_lines import OrderLineParser
+
+
+def make_fields(catalog, count, seed=1):
+    """Random "Items Ordered" fields in the format submit_order writes."""
+    rng = random.Random(seed)
+    names = list(catalog)
+    fields = []
+    for _ in range(count):
+        picked = rng.sample(names, rng.randint(1, min(6, len(names))))
+        fields.append("; ".join(f"{rng.randint(1, 10)}x {name}" for name in picked))
+    return fields
+
+
+def main(count=200000):
+    catalog = TakeawayApp().items_by_name
+    fields = make_fields(catalog, count)
+    total_lines = sum(field.count(";") + 1 for field in fields)
+
+    # Warm: realistic fields, so repeated entries come from the parser's cache
+    parser = OrderLineParser(catalog)
+    errors = []
+    parsed = 0
+    start = time.perf_counter()
+    for field in fields:
+        parsed += len(parser.parse(field, errors))
+    elapsed = time.perf_counter() - start
+    print(f"warm cache: {parsed} lines in {elapsed:.3f}s = {parsed / elapsed:,.0f} lines/s"
+          f" ({len(errors)} errors)")
+
+    # Cold: every entry string is new to the parser, so nothing comes from the cache
+    parser = OrderLineParser(catalog)
+    unique = [f"{n}x {name}" for n in range(1, 11) for name in catalog] * (total_lines // (10 * len(catalog)) + 1)
+    start = time.perf_counter()
+    for entry in unique[:total_lines]:
+        parser.clear_cache()
+        parser.parse_entry(entry)
+    elapsed = time.perf_counter() - start
+    print(f"cold cache: {total_lines} lines in {elapsed:.3f}s = {total_lines / elapsed:,.0f} lines/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# Reports scrypt hashes per second at each cost setting in passwords.py, to
+# help pick a work factor for the counter terminals. Run from "Iteration 3":
+#     python benchmarks/bench_passwords.py
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passwords import COST_SETTINGS, DEFAULT_COST, hash_password
+
+
+def hashes_per_second(cost, min_seconds=1.0):
+    count = 0
+    start = time.perf_counter()
+    while True:
+        hash_password("benchmark-password", cost)
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return count / elapsed
+
+
+def main():
+    print(f"{'setting':>8} {'n':>7} {'r':>2} {'p':>2} {'memory':>8} {'hashes/s':>9} {'ms/login':>9}")
+    results = {}
+    for name, (n, r, p) in COST_SETTINGS.items():
+        rate = hashes_per_second((n, r, p))
+        results[name] = rate
+        marker = "  <- default" if (n, r, p) == DEFAULT_COST else ""
+        memory_mb = 128 * n * r / (1024 * 1024)
+        print(f"{name:>8} {n:>7} {r:>2} {p:>2} {memory_mb:>6.0f}MB {rate:>9.1f} {1000 / rate:>9.1f}{marker}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
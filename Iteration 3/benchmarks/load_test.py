@@ -0,0 +1,439 @@
+# Load generator: replays ordering sessions (login, browse categories, add
+# items, +/- quantity changes, delivery toggle, submit) and reports
+# throughput, p50/p95/p99 latency and error rate for each operation.
+# Baskets follow the item mix, basket sizes and quantities in orders.csv.
+# Run from the "Iteration 3" folder:
+#     python benchmarks/load_test.py engine --sessions 500 --concurrency 8
+#     python benchmarks/load_test.py seed --users 1000 --users-db users.db
+#     python benchmarks/load_test.py service --url http://127.0.0.1:8080 \
+#         --users 1000 --duration 60 --concurrency 50
+# "engine" drives TakeawayApp baskets, the credential check and OrderWriter
+# in this process, with a throwaway users.db/orders.db in a temp folder.
+# "service" drives a running order_service.py or order_cluster.py over HTTP;
+# its submitted orders are real orders in that service's store. "seed" adds
+# the test accounts (loadtest0000, loadtest0001, ...) to the service's users.db.
+# Each session logs in as a random account from the pool, so logins mostly
+# miss the recent-login cache and pay for a real password hash, as they
+# would with many customers; --no-login-cache (engine) makes every login do so.
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from credentials import CredentialStore
+from passwords import hash_password
+from order_lines import OrderLineParser
+from order_service import SAVE_TIMEOUT
+from order_store import OrderStore, ORDERS_CSV
+from order_writer import OrderWriter
+from takeaway_engine import TakeawayApp, MAX_ITEM_QTY
+
+OPERATIONS = ("login", "browse", "add", "plus", "minus", "delivery", "submit")
+
+
+def user_names(prefix, count):
+    return [f"{prefix}{n:04d}" for n in range(count)]
+
+
+def seed_users(users_db, prefix, password, count):
+    """Add count test accounts to users_db. Returns how many were new."""
+    store = CredentialStore(users_db)
+    # One hash for all: each account's record is still a real scrypt record,
+    # and the verifier's cache is per username, so sharing it changes nothing
+    record = hash_password(password)
+    with store.conn:
+        added = store.conn.executemany(
+            "INSERT OR IGNORE INTO users (username, password) VALUES (?, ?)",
+            ((name, record) for name in user_names(prefix, count))).rowcount
+    store.conn.close()
+    return added
+
+
+# ---------------- what a session looks like ----------------
+class ItemMix:
+    #Item popularity, basket sizes and quantities, taken from past orders.
+    def __init__(self, app, csv_path=ORDERS_CSV):
+        self.app = app
+        weights = defaultdict(int)      # item_id -> units sold
+        self.sizes = []                 # lines per order
+        self.quantities = []            # qty per line
+        parser = OrderLineParser(app.items_by_name)
+        try:
+            with open(csv_path, newline="", encoding="utf-8") as f:
+                rows = csv.reader(f)
+                next(rows, None)        # header
+                for row in rows:
+                    if len(row) < 2:
+                        continue
+                    lines = [line for line in parser.parse(row[1]) if line[0] is not None]
+                    if not lines:
+                        continue
+                    self.sizes.append(len(lines))
+                    for item_id, name, qty, cost in lines:
+                        weights[item_id] += qty
+                        self.quantities.append(min(qty, MAX_ITEM_QTY))
+        except FileNotFoundError:
+            pass
+        if not weights:     # no history yet: every item equally likely
+            weights = {item_id: 1 for item_id in app.items_by_id}
+            self.sizes = [1, 2, 3]
+            self.quantities = [1, 1, 2]
+        self.item_ids = list(weights)
+        self.weights = [weights[item_id] for item_id in self.item_ids]
+        self.orders_seen = len(self.sizes)
+
+    def basket(self, rng):
+        """A list of (item_id, qty) lines, with distinct items."""
+        size = min(rng.choice(self.sizes), len(self.item_ids))
+        picked = {}
+        while len(picked) < size:
+            item_id = rng.choices(self.item_ids, self.weights)[0]
+            picked.setdefault(item_id, rng.choice(self.quantities))
+        return list(picked.items())
+
+
+def make_session(mix, rng, submit_ratio, users):
+    """The operations of one customer visit, in order, as (operation, *args) tuples."""
+    categories = list(mix.app.menu)
+    basket = mix.basket(rng)
+    ops = [("login", rng.choice(users))]
+    for _ in range(rng.randint(1, 3)):
+        ops.append(("browse", rng.choice(categories)))
+    for item_id, qty in basket:
+        ops.append(("add", item_id, qty))
+    for _ in range(rng.randint(0, 3)):      # second thoughts in the order panel
+        item_id, qty = rng.choice(basket)
+        ops.append(("plus", item_id) if qty < MAX_ITEM_QTY and rng.random() < 0.5 else ("minus", item_id))
+    delivery = rng.random() < 0.5
+    ops.append(("delivery", delivery))
+    if rng.random() < submit_ratio:
+        ops.append(("submit", delivery))
+    return ops
+
+
+# ---------------- results ----------------
+class LoadStats:
+    def __init__(self):
+        self.latencies = defaultdict(list)     # operation -> seconds
+        self.errors = defaultdict(int)
+        self.sessions = 0
+        self.lock = threading.Lock()
+
+    def record(self, operation, seconds, ok):
+        with self.lock:
+            self.latencies[operation].append(seconds)
+            if not ok:
+                self.errors[operation] += 1
+
+    def report(self, elapsed):
+        rows = []
+        for operation in OPERATIONS:
+            samples = sorted(self.latencies.get(operation, ()))
+            if not samples:
+                continue
+            count = len(samples)
+            rows.append({
+                "operation": operation,
+                "count": count,
+                "per_second": round(count / elapsed, 1),
+                "error_rate": round(self.errors[operation] / count, 4),
+                "p50_ms": round(1000 * percentile(samples, 50), 3),
+                "p95_ms": round(1000 * percentile(samples, 95), 3),
+                "p99_ms": round(1000 * percentile(samples, 99), 3),
+            })
+        return {"elapsed_s": round(elapsed, 2), "sessions": self.sessions,
+                "sessions_per_second": round(self.sessions / elapsed, 1), "operations": rows}
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, -(-len(sorted_samples) * pct // 100))
+    return sorted_samples[int(rank) - 1]
+
+
+def print_report(report):
+    print(f"{report['sessions']} sessions in {report['elapsed_s']}s "
+          f"({report['sessions_per_second']} sessions/s)")
+    print(f"{'operation':<10}{'count':>8}{'ops/s':>10}{'errors':>8}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for row in report["operations"]:
+        print(f"{row['operation']:<10}{row['count']:>8}{row['per_second']:>10}"
+              f"{row['error_rate']:>8.1%}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+
+
+# ---------------- engine target ----------------
+class EngineTarget:
+    #One TakeawayApp basket per session over a shared menu, the real password
+    #check and OrderWriter, all in this process.
+    def __init__(self, app, workdir, username, password, users, login_cache=True):
+        self.app = app
+        self.password = password
+        self.login_cache = login_cache
+        self.users_db = os.path.join(workdir, "users.db")
+        seed_users(self.users_db, username, password, users)
+        self._local = threading.local()     # SQLite connections can't cross threads
+        self.order_writer = OrderWriter(OrderStore(os.path.join(workdir, "orders.db")),
+                                        csv_path=os.path.join(workdir, "orders.csv"))
+
+    def run_session(self, ops, stats):
+        basket = None
+        for op in ops:
+            start = time.perf_counter()
+            ok = True
+            try:
+                if op[0] == "login":
+                    credentials = self._credentials()
+                    record = credentials.get_record(op[1])
+                    ok = credentials.verify(op[1], self.password, record)
+                    basket = TakeawayApp(catalog=self.app)
+                elif op[0] == "browse":
+                    self.app.category_version(op[1])
+                    ok = bool(self.app.menu[op[1]])
+                elif op[0] == "add":
+                    ok = basket.add_to_order(op[1], op[2])
+                elif op[0] in ("plus", "minus"):
+                    item = self.app.get_item(op[1])
+                    qty = basket.get_item_quantity(item.item_id)
+                    basket.update_item_quantity(item.name, qty + (1 if op[0] == "plus" else -1))
+                elif op[0] == "delivery":
+                    basket.build_order(delivery=op[1])      # the totals the order panel shows
+                elif op[0] == "submit":
+                    ok = self._submit(basket, op[1])
+            except Exception:
+                ok = False
+            stats.record(op[0], time.perf_counter() - start, ok)
+
+    def _credentials(self):
+        if not hasattr(self._local, "credentials"):
+            self._local.credentials = CredentialStore(self.users_db)
+            if not self.login_cache:
+                self._local.credentials.verifier.max_entries = 0
+        return self._local.credentials
+
+    def _submit(self, basket, delivery):
+        if not basket.order:
+            return True     # every line was taken back out: nothing to place
+        saved = threading.Event()
+        result = {}
+
+        def on_saved(order_id, error):
+            result["order_id"] = order_id
+            saved.set()
+
+        self.order_writer.submit(basket.build_order(delivery=delivery), on_saved)
+        if not saved.wait(SAVE_TIMEOUT):
+            return False    # counted as an error, like the service's 504
+        basket.clear_order()
+        return result["order_id"] is not None
+
+    def close(self):
+        self.order_writer.close()
+
+
+def run_engine(args, mix):
+    stats = LoadStats()
+    rngs = [random.Random(args.seed + n) for n in range(args.concurrency)]
+    users = user_names(args.username, args.users)
+    counter = {"left": args.sessions}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration if args.duration else None
+
+    with tempfile.TemporaryDirectory() as workdir:
+        target = EngineTarget(mix.app, workdir, args.username, args.password, args.users,
+                              login_cache=not args.no_login_cache)
+
+        def worker(rng):
+            while deadline is None or time.perf_counter() < deadline:
+                with lock:
+                    if deadline is None and counter["left"] <= 0:
+                        return
+                    counter["left"] -= 1
+                target.run_session(make_session(mix, rng, args.submit_ratio, users), stats)
+                with stats.lock:
+                    stats.sessions += 1
+
+        threads = [threading.Thread(target=worker, args=(rng,)) for rng in rngs]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        target.close()
+    return stats.report(elapsed)
+
+
+# ---------------- service target ----------------
+class ServiceClient:
+    #One keep-alive HTTP/1.1 connection to order_service.py / order_cluster.py.
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, payload=None):
+        """Returns (status, JSON reply); reconnects if the server closed the connection."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1")
+            + body
+        )
+        try:
+            await self.writer.drain()
+            status = int((await self.reader.readline()).split()[1])
+            length, close = 0, False
+            while True:
+                line = await self.reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                name = name.strip().lower()
+                if name == "content-length":
+                    length = int(value)
+                elif name == "connection":
+                    close = value.strip().lower() == "close"
+            reply = json.loads(await self.reader.readexactly(length)) if length else {}
+        except BaseException:
+            self.close()
+            raise
+        if close:
+            self.close()
+        return status, reply
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def run_service_session(client, ops, stats, password):
+    session_id = None
+    basket = {}         # item_id -> qty, as the client last saw it
+    for op in ops:
+        start = time.perf_counter()
+        try:
+            if op[0] == "login":
+                status, reply = await client.request(
+                    "POST", "/login", {"username": op[1], "password": password})
+                session_id = reply.get("session_id")
+                ok = status == 201 and session_id is not None
+            elif session_id is None:
+                ok = False      # login failed, so every step of this visit fails too
+            elif op[0] == "browse":
+                status, reply = await client.request("GET", "/menu")
+                ok = status == 200 and op[1] in reply
+            elif op[0] == "add":
+                status, reply = await client.request(
+                    "POST", f"/sessions/{session_id}/items", {"item_id": op[1], "quantity": op[2]})
+                ok = status == 200
+                if ok:
+                    basket[op[1]] = basket.get(op[1], 0) + op[2]
+            elif op[0] in ("plus", "minus"):
+                qty = max(0, basket.get(op[1], 0) + (1 if op[0] == "plus" else -1))
+                status, reply = await client.request(
+                    "PUT", f"/sessions/{session_id}/items/{op[1]}", {"quantity": qty})
+                ok = status == 200 or (status == 404 and not basket.get(op[1]))
+                if status == 200:
+                    basket[op[1]] = qty
+            elif op[0] == "delivery":
+                # Totals are worked out client-side; the toggle re-reads the basket
+                status, reply = await client.request("GET", f"/sessions/{session_id}/basket")
+                ok = status == 200
+            elif op[0] == "submit":
+                if not any(basket.values()):
+                    ok = True
+                else:
+                    status, reply = await client.request(
+                        "POST", f"/sessions/{session_id}/submit", {"delivery": op[1]})
+                    ok = status == 201
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+            ok = False
+        stats.record(op[0], time.perf_counter() - start, ok)
+    if session_id is not None:
+        try:
+            await client.request("DELETE", f"/sessions/{session_id}")
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+            pass
+
+
+async def run_service(args, mix):
+    url = urlsplit(args.url)
+    users = user_names(args.username, args.users)
+    stats = LoadStats()
+    counter = {"left": args.sessions}
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + args.duration if args.duration else None
+
+    async def worker(rng):
+        client = ServiceClient(url.hostname, url.port or 80)
+        try:
+            while deadline is None or loop.time() < deadline:
+                if deadline is None:
+                    if counter["left"] <= 0:
+                        return
+                    counter["left"] -= 1
+                ops = make_session(mix, rng, args.submit_ratio, users)
+                await run_service_session(client, ops, stats, args.password)
+                stats.sessions += 1
+        finally:
+            client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(random.Random(args.seed + n)) for n in range(args.concurrency)))
+    return stats.report(time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay ordering sessions and report latency.")
+    parser.add_argument("target", choices=("engine", "service", "seed"))
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="service to load (service target)")
+    parser.add_argument("--username", default="loadtest", help="prefix of the test account names")
+    parser.add_argument("--password", default="loadtest-password", help="password of every test account")
+    parser.add_argument("--users", type=int, default=1000, help="test accounts to log in as")
+    parser.add_argument("--users-db", default="users.db", help="where seed adds the accounts")
+    parser.add_argument("--no-login-cache", action="store_true",
+                        help="engine: turn off the recent-login cache, so every login hashes")
+    parser.add_argument("--orders-csv", default=ORDERS_CSV, help="order history for the item mix")
+    parser.add_argument("--sessions", type=int, default=200, help="sessions to run (ignored with --duration)")
+    parser.add_argument("--duration", type=float, default=None, help="run for this many seconds instead")
+    parser.add_argument("--concurrency", type=int, default=4, help="sessions in flight at once")
+    parser.add_argument("--submit-ratio", type=float, default=0.9,
+                        help="share of sessions that place their order (the rest abandon it)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", metavar="PATH", help="also write the report here as JSON")
+    args = parser.parse_args()
+
+    if args.target == "seed":
+        added = seed_users(args.users_db, args.username, args.password, args.users)
+        print(f"added {added} test accounts to {args.users_db}")
+        return
+
+    mix = ItemMix(TakeawayApp(), args.orders_csv)
+    print(f"item mix from {mix.orders_seen} past orders, {len(mix.item_ids)} items")
+    if args.target == "engine":
+        report = run_engine(args, mix)
+    else:
+        report = asyncio.run(run_service(args, mix))
+    report["target"] = args.target
+    report["concurrency"] = args.concurrency
+    report["users"] = args.users
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
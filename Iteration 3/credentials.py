@@ -0,0 +1,164 @@
+# Credential store: usernames live in a SQLite table with the username as
+# primary key, so a login is one indexed lookup however many customers have
+# signed up, and a username can only be registered once. Passwords are kept
+# as salted scrypt records (see passwords.py), never in plain text.
+import functools
+import os
+import sqlite3
+
+from passwords import hash_password, is_hashed, needs_rehash, verify_password, PasswordVerifier
+
+USERS_DB = "users.db"
+USERS_FILE = "users.txt"
+
+
+@functools.lru_cache(maxsize=None)
+def _dummy_record():
+    # A real hash no password matches, so an unknown username costs as much as a known one
+    return hash_password(os.urandom(16).hex())
+
+
+class CredentialStore:
+    def __init__(self, db_path=USERS_DB):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS users ("
+            " username TEXT PRIMARY KEY,"
+            " password TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+        self.verifier = PasswordVerifier()
+
+    def close(self):
+        self.conn.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def has_users(self):
+        """Return True if at least one user is registered."""
+        return self.conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is not None
+
+    def user_exists(self, username):
+        """Return True if the username is already registered."""
+        row = self.conn.execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone()
+        return row is not None
+
+    def add_user(self, username, password, record=None):
+        """Register a new user. Returns False if the username is taken.
+
+        record is an already-computed hash_password() result, for callers that
+        hash on a worker thread.
+        """
+        if record is None:
+            record = hash_password(password)
+        try:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT INTO users (username, password) VALUES (?, ?)", (username, record)
+                )
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def get_record(self, username):
+        """Return the stored password record for username, or None."""
+        row = self.conn.execute(
+            "SELECT password FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_record(self, username, record):
+        """Replace a user's password record (e.g. after a rehash)."""
+        with self.conn:
+            self.conn.execute("UPDATE users SET password = ? WHERE username = ?", (record, username))
+        self.verifier.forget(username)
+
+    def verify(self, username, password, record):
+        """Check a password against a record from get_record(). Thread-safe, no DB access."""
+        if record is None:
+            verify_password(password, _dummy_record())     # same time as a wrong password
+            return False
+        return self.verifier.verify(username, password, record)
+
+    def check_password(self, username, password, record):
+        """Return (valid, new_record) for a record from get_record().
+
+        new_record is an upgraded hash to store with set_record() when the old
+        one is plaintext or weaker than the default cost, otherwise None.
+        Thread-safe, no DB access, so the slow part can run on a worker thread.
+        """
+        if not self.verify(username, password, record):
+            return False, None
+        return True, hash_password(password) if needs_rehash(record) else None
+
+    def check_login(self, username, password):
+        """Return True if the username exists and the password matches.
+
+        Blocks for the length of a hash; the login screen and order_service.py
+        run check_password() on a worker thread instead.
+        """
+        valid, new_record = self.check_password(username, password, self.get_record(username))
+        if new_record is not None:
+            self.set_record(username, new_record)
+        return valid
+
+    def import_users_file(self, path=USERS_FILE):
+        """One-time import of the old users.txt ("username,password" per line).
+
+        The first line for a username wins; later duplicates are skipped.
+        Returns (imported, skipped), or None if the file was already imported
+        or doesn't exist.
+        """
+        key = "imported:" + os.path.abspath(path)
+        if self.conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+            return None
+        try:
+            users_file = open(path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+        imported = skipped = 0
+        with users_file, self.conn:
+            for line in users_file:
+                parts = line.strip().split(',')
+                if len(parts) != 2:
+                    skipped += 1
+                    continue
+                username, password = parts
+                if self.user_exists(username):
+                    skipped += 1
+                    continue
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO users (username, password) VALUES (?, ?)",
+                    (username, hash_password(password)),
+                )
+                if cursor.rowcount:
+                    imported += 1
+                else:
+                    skipped += 1
+            self.conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, str(imported)))
+        return imported, skipped
+
+    def hash_plaintext_records(self):
+        """Hash any plaintext passwords still in the table (runs once per database).
+
+        Returns how many records were updated.
+        """
+        key = "plaintext_hashed"
+        if self.conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+            return 0
+        rows = self.conn.execute("SELECT username, password FROM users").fetchall()
+        updated = 0
+        with self.conn:
+            for username, record in rows:
+                if not is_hashed(record):
+                    self.conn.execute(
+                        "UPDATE users SET password = ? WHERE username = ?",
+                        (hash_password(record), username),
+                    )
+                    updated += 1
+            self.conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, str(updated)))
+        return updated
@@ -0,0 +1,79 @@
+# LRU cache of resized menu pictures, so select_item doesn't decode and
+# resize the full-size file on every click.
+from collections import OrderedDict
+from PIL import Image, ImageTk
+
+from thumbnails import fresh_thumbnail
+
+NO_IMAGE_PATH = "images/no_image.png"
+ITEM_IMAGE_SIZE = (200, 150)        # size of the picture shown in the display frame
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024  # roughly 270 pictures at 200x150
+
+
+def load_resized(path, size):
+    """Open an image file and resize it. Safe to call off the Tk thread."""
+    # Use the pre-rendered thumbnail from thumbnails.py when it is up to date
+    thumb = fresh_thumbnail(path, size)
+    if thumb is not None:
+        with Image.open(thumb) as img:
+            img.load()
+            return img
+    with Image.open(path) as img:
+        return img.resize(size, Image.Resampling.LANCZOS)
+
+
+class ImageCache:
+    #Maps (image_path, size) -> ImageTk.PhotoImage, evicting least recently used
+    #pictures once the estimated memory use goes over max_bytes.
+    #A cached value of None means "no picture available" (file and fallback both missing).
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, fallback_path=NO_IMAGE_PATH):
+        self.max_bytes = max_bytes
+        self.fallback_path = fallback_path
+        self.current_bytes = 0
+        self._entries = OrderedDict()   # key -> (photo, size_in_bytes)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, path, size=ITEM_IMAGE_SIZE):
+        """Return the PhotoImage for path at size (or None), loading it on a miss."""
+        key = (path or self.fallback_path, size)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+        try:
+            photo = self.put(key[0], size, load_resized(key[0], size))
+        except Exception:
+            # Missing or unreadable file: remember the fallback for this key
+            # so the disk isn't hit again on the next click.
+            photo = None
+            if key[0] != self.fallback_path:
+                photo = self.get(self.fallback_path, size)
+            self._store(key, photo, 0)
+        return photo
+
+    def put(self, path, size, pil_image):
+        """Store an already-resized PIL image. Must run on the Tk thread."""
+        photo = ImageTk.PhotoImage(pil_image)
+        self._store((path, size), photo, size[0] * size[1] * 4)
+        return photo
+
+    def _store(self, key, photo, nbytes):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.current_bytes -= old[1]
+        self._entries[key] = (photo, nbytes)
+        self.current_bytes += nbytes
+
+        # Evict least recently used pictures until back under the cap
+        while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted_bytes) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_bytes
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
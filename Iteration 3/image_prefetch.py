@@ -0,0 +1,70 @@
+# Decodes and resizes menu pictures on a thread pool so the first click on an
+# item doesn't pay for it on the Tk main thread. Workers only touch PIL; the
+# finished images are handed back to Tk through a queue drained with after().
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from image_cache import load_resized, ITEM_IMAGE_SIZE
+
+POLL_MS = 30    # how often the Tk thread checks for finished pictures
+
+
+class ImagePrefetcher:
+    def __init__(self, widget, cache, max_workers=2):
+        self.widget = widget          # any Tk widget, used for after()
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._done = queue.Queue()    # (path, size, pil_image or None)
+        self._pending = set()
+        self._polling = False
+        self._closed = False
+
+    def prefetch(self, paths, size=ITEM_IMAGE_SIZE):
+        """Queue pictures for background loading, skipping cached or queued ones."""
+        if self._closed:
+            return
+        for path in paths:
+            key = (path, size)
+            if not path or key in self._pending or key in self.cache:
+                continue
+            self._pending.add(key)
+            self._executor.submit(self._load, path, size)
+        self._schedule_poll()
+
+    def _load(self, path, size):
+        # Runs on a worker thread: no Tk calls allowed here
+        try:
+            image = load_resized(path, size)
+        except Exception:
+            image = None
+        self._done.put((path, size, image))
+
+    def _schedule_poll(self):
+        if self._pending and not self._polling and not self._closed:
+            self._polling = True
+            self.widget.after(POLL_MS, self._drain)
+
+    def _drain(self):
+        # Runs on the Tk thread: PhotoImages may only be created here
+        self._polling = False
+        if self._closed:
+            return
+        while True:
+            try:
+                path, size, image = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self._pending.discard((path, size))
+            if (path, size) in self.cache:
+                continue
+            if image is not None:
+                self.cache.put(path, size, image)
+            else:
+                # Let the cache record the no-image fallback for this path
+                self.cache.get(path, size)
+        self._schedule_poll()
+
+    def close(self):
+        """Stop the worker threads; queued loads that haven't started are dropped."""
+        self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -1,131 +1,21 @@
 import tkinter as tk
 from tkinter import messagebox
+import queue
+import threading
 from order_gui import place_order_gui   
-
-# -------------------- CLASSES --------------------
-class MenuItem:
-    #Represents a single menu item with ID, name, price, and optional image.
-    def __init__(self, item_id, name, price, image_path=None):
-        self.item_id = item_id
-        self.name = name
-        self.price = price
-        self.image_path = image_path
-
-#Main application logic for managing menu, orders, and item quantities.
-class TakeawayApp:
-    def __init__(self):
-        
-        self.menu = {
-            "Mains": [
-                MenuItem(1, "Burger", 8.50, "images/burger.jpeg"),
-                MenuItem(2, "Pizza", 12.00, "images/pizza.png"),
-                MenuItem(3, "Pasta", 11.00, "images/pasta.png")
-            ],
-            "Sides": [
-                MenuItem(4, "Fries", 4.00, "images/fries.png"),
-                MenuItem(5, "Salad", 5.00, "images/salad.png"),
-                MenuItem(6, "Garlic naan", 3.50, "images/garlic_naan.png")
-            ],
-            "Drinks": [
-                MenuItem(7, "Cola", 2.50, "images/cola.png"),
-                MenuItem(8, "O_Juice", 3.00, "images/o_juice.png"),
-                MenuItem(9, "Lemonade", 3.50, "images/lemonade.png")
-            ]
-        }
-
-        # Stores order as a list of tuples: (item_name, qty, total_cost)
-        self.order = []
-        self.total_cost = 0.0
-
-        # Tracks how many of each item (by item_id) have been ordered
-        self.item_quantities = {}
-
-    def add_to_order(self, item_id, quantity):
-        """Add an item to the order, enforcing max qty of 10 per item."""
-        for category, items in self.menu.items():
-            for item in items:
-                if item.item_id == item_id:
-                    current_qty = self.item_quantities.get(item_id, 0)
-                    total_qty = current_qty + quantity
-
-                    # Restrict max quantity of each item to 10
-                    if total_qty > 10:
-                        return False
-
-                    self.item_quantities[item_id] = total_qty
-
-                    
-                    found = False
-                    new_order = []
-                    self.total_cost = 0.0
-                    for name, qty, cost in self.order:
-                        if name == item.name:
-                            # Update existing item in order
-                            qty += quantity
-                            cost = qty * item.price
-                            new_order.append((name, qty, cost))
-                            found = True
-                        else:
-                            new_order.append((name, qty, cost))
-                        self.total_cost += new_order[-1][2]
-
-                    # If item not already in order, add new entry
-                    if not found:
-                        new_order.append((item.name, quantity, item.price * quantity))
-                        self.total_cost += item.price * quantity
-
-                    self.order = new_order
-                    return True
-        return False
-#Update quantity of an existing item. Remove if new_qty=0.
-    def update_item_quantity(self, item_name, new_qty):
-        
-        new_order = []
-        self.total_cost = 0.0
-        for name, qty, cost in self.order:
-            if name == item_name:
-                # Find item_id for updating item_quantities dict
-                item_id = next(
-                    (item.item_id for cat in self.menu.values() for item in cat if item.name == name),
-                    None
-                )
-                if new_qty > 0:
-                    # Update quantity + cost
-                    unit_price = cost / qty
-                    cost = unit_price * new_qty
-                    new_order.append((name, new_qty, cost))
-                    self.total_cost += cost
-                    if item_id:
-                        self.item_quantities[item_id] = new_qty
-                else:
-                    # If qty = 0, remove item completely
-                    if item_id and item_id in self.item_quantities:
-                        del self.item_quantities[item_id]
-            else:
-                new_order.append((name, qty, cost))
-                self.total_cost += cost
-        self.order = new_order
-
-    def get_item_quantity(self, item_id):
-        """Return the quantity of an item currently in the order."""
-        return self.item_quantities.get(item_id, 0)
-
-    def get_order_summary(self):
-        """Return formatted order summary with all items + total cost."""
-        if not self.order:
-            return "No items ordered yet."
-        summary = ""
-        for name, qty, cost in self.order:
-            summary += f"{qty} x {name} - ${cost:.2f}\n"
-        summary += f"\nTotal cost: ${self.total_cost:.2f}"
-        return summary
-
+from takeaway_engine import MenuItem, OrderLedger, TakeawayApp   # re-exported for older imports
+from credentials import CredentialStore
+from passwords import hash_password
+from order_store import OrderStore
+from order_writer import OrderWriter
+from order_log_index import OrderLogIndex
+from sessions import SessionManager, open_user_session
 
 # -------------------- SIGNUP --------------------
 import tkinter as tk
 from tkinter import messagebox
 
-def signup():
+def signup(store):
     # Signup screen: allows new users to register with username, password, and age check.
     window = tk.Tk()
     window.title("Signup")
@@ -169,20 +59,62 @@ def signup():
             messagebox.showerror("Signup Error", "Invalid age input.")
             return
 
-        # --- Save user to file ---
-        with open("users.txt", "a") as users_file:
-            users_file.write(f"{username},{password}\n")
+        if store.user_exists(username):
+            messagebox.showerror("Signup Error", "That username is already taken.")
+            return
 
-        messagebox.showinfo("Signup", "Signup successful!")
-        window.destroy()
+        # --- Hash password off the Tk thread, then save user (usernames are unique) ---
+        def saved(record):
+            submit_btn.config(state="normal")
+            if not store.add_user(username, password, record):
+                messagebox.showerror("Signup Error", "That username is already taken.")
+                return
+            messagebox.showinfo("Signup", "Signup successful!")
+            window.destroy()
+
+        def failed(error):
+            submit_btn.config(state="normal")
+            messagebox.showerror("Signup Error", f"Could not save your password:\n{error}")
+
+        submit_btn.config(state="disabled")
+        run_in_worker(window, lambda: hash_password(password), saved, failed)
 
-    tk.Button(window, text="Submit", command=submit).grid(row=3, column=0, columnspan=2)
+    submit_btn = tk.Button(window, text="Submit", command=submit)
+    submit_btn.grid(row=3, column=0, columnspan=2)
     window.mainloop()
 
 
+# -------------------- BACKGROUND WORK --------------------
+def run_in_worker(window, work, on_done, on_error, poll_ms=20):
+    """Run work() on a worker thread and call on_done(result) back on the Tk thread.
+
+    If work() raises, on_error(exception) is called on the Tk thread instead.
+    Used for password hashing so the window keeps responding while it runs.
+    """
+    results = queue.Queue()
+
+    def run():
+        try:
+            results.put((on_done, work()))
+        except Exception as e:
+            results.put((on_error, e))
+
+    threading.Thread(target=run, daemon=True).start()
+
+    def poll():
+        try:
+            callback, result = results.get_nowait()
+        except queue.Empty:
+            window.after(poll_ms, poll)
+            return
+        callback(result)
+
+    window.after(poll_ms, poll)
+
+
 # -------------------- LOGIN --------------------
-def login(app):
-    """Login screen: verifies credentials from users.txt and launches order GUI."""
+def login(app, store, order_writer, sessions):
+    """Login screen: verifies credentials against the user store and launches order GUI."""
     window = tk.Tk()
     window.title("Login")
 
@@ -199,31 +131,39 @@ def login(app):
         """Check credentials against saved users."""
         username = username_entry.get()
         password = password_entry.get()
-        valid_login = False
 
-        try:
-            with open("users.txt", "r") as users_file:
-                for line in users_file:
-                    parts = line.strip().split(',')
-                    if len(parts) != 2:
-                        continue
-                    stored_username, stored_password = parts
-                    if username == stored_username and password == stored_password:
-                        valid_login = True
-                        break
-        except FileNotFoundError:
-            messagebox.showerror("Error", "No user file found. Please sign up first.")
+        if not store.has_users():
+            messagebox.showerror("Error", "No users registered. Please sign up first.")
             window.destroy()
             return
 
-        if valid_login:
-            messagebox.showinfo("Login", "Login successful!")
-            window.destroy()
-            place_order_gui(app)   # Open ordering GUI after successful login
-        else:
-            messagebox.showerror("Login", "Invalid username or password.")
+        record = store.get_record(username)
+
+        def checked(result):
+            valid_login, new_record = result
+            submit_btn.config(state="normal")
+            if valid_login:
+                if new_record is not None:
+                    store.set_record(username, new_record)   # upgrade old/weaker hashes
+                messagebox.showinfo("Login", "Login successful!")
+                window.destroy()
+                session = open_user_session(sessions, username)
+                sessions.hold(session)      # not evicted while its order window is open
+                place_order_gui(app, order_writer, session.basket,   # Open ordering GUI after successful login
+                                on_close=lambda: sessions.release(session))
+            else:
+                messagebox.showerror("Login", "Invalid username or password.")
+
+        def failed(error):
+            submit_btn.config(state="normal")
+            messagebox.showerror("Login", f"Could not check your password:\n{error}")
+
+        submit_btn.config(state="disabled")
+        # Worker thread: the slow hash happens there, no Tk or DB calls
+        run_in_worker(window, lambda: store.check_password(username, password, record), checked, failed)
 
-    tk.Button(window, text="Submit", command=submit).grid(row=2, column=0, columnspan=2)
+    submit_btn = tk.Button(window, text="Submit", command=submit)
+    submit_btn.grid(row=2, column=0, columnspan=2)
     window.mainloop()
 
 
@@ -231,6 +171,14 @@ def login(app):
 def main():
     """Main app entry point: launches Welcome screen with Signup + Login options."""
     app = TakeawayApp()   
+    sessions = SessionManager(app)   # each user who logs in gets their own basket
+    store = CredentialStore()
+    store.import_users_file()   # brings in users.txt the first time only
+    store.hash_plaintext_records()
+    order_store = OrderStore()
+    order_store.import_csv(catalog=app.items_by_name)   # brings in orders.csv the first time only
+    # saves submitted orders off the Tk thread, and keeps the orders.csv index current
+    order_writer = OrderWriter(order_store, log_index=OrderLogIndex())
 
     window = tk.Tk()
     window.title("Welcome")
@@ -250,10 +198,12 @@ def main():
     frame.place(relx=0.5, rely=0.5, anchor='center')
 
     # Signup + Login buttons
-    tk.Button(frame, text="Signup", command=signup).grid(row=0, column=0, padx=10)
-    tk.Button(frame, text="Login", command=lambda: login(app)).grid(row=0, column=1, padx=10)
+    tk.Button(frame, text="Signup", command=lambda: signup(store)).grid(row=0, column=0, padx=10)
+    tk.Button(frame, text="Login", command=lambda: login(app, store, order_writer, sessions)).grid(row=0, column=1, padx=10)
 
     window.mainloop()
+    order_writer.close()    # make sure every submitted order is on disk before exiting
+    sessions.close_all()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,28 @@
+# Money helpers: amounts are kept as whole cents (ints) so totals never drift
+# the way repeated float arithmetic does. Convert to cents once, on the way in,
+# and only format back to dollars for display or for writing to orders.csv.
+from decimal import Decimal, ROUND_HALF_UP
+
+CENT = Decimal("0.01")
+
+
+def to_cents(amount):
+    """Convert a dollar amount (int, float, str or Decimal) to whole cents."""
+    if isinstance(amount, Decimal):
+        value = amount
+    else:
+        # str() first so 8.1 becomes Decimal("8.1") and not 8.0999999...
+        value = Decimal(str(amount).strip())
+    return int((value.quantize(CENT, rounding=ROUND_HALF_UP) * 100).to_integral_value())
+
+
+def to_decimal(cents):
+    """Return cents as an exact Decimal dollar amount."""
+    return Decimal(cents).scaleb(-2)
+
+
+def format_money(cents):
+    """Format cents as a plain dollar string, e.g. 850 -> '8.50'."""
+    sign = "-" if cents < 0 else ""
+    dollars, rest = divmod(abs(cents), 100)
+    return f"{sign}{dollars}.{rest:02d}"
@@ -0,0 +1,175 @@
+# Vectorised aggregation over the columnar order history (see order_columns.py).
+# Everything is computed with NumPy array operations (bincount, unique,
+# percentile, cumsum) rather than Python loops over orders.
+#
+#     python order_analytics.py                  (updates the columns, prints reports)
+#     python order_analytics.py --day 2025-10-15 (end-of-day report for one day)
+import argparse
+
+import numpy as np
+
+from money import format_money
+from order_columns import COLUMNS_DIR, ORDERS_CSV, export, load_columns
+
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+class OrderAnalytics:
+    def __init__(self, columns, items):
+        self.columns = columns
+        self.items = items      # line_item code -> item name
+
+        placed_at = columns["placed_at"]
+        self.days = placed_at.astype("datetime64[D]")
+        self.hours = ((placed_at - self.days).astype("timedelta64[h]")).astype(np.int64)
+        # 1970-01-01 was a Thursday, so shift by 3 to make Monday 0
+        self.weekdays = (self.days.astype(np.int64) + 3) % 7
+        self.is_delivery = columns["delivery_cents"] > 0
+
+    @classmethod
+    def load(cls, columns_dir=COLUMNS_DIR, source=None, catalog=None):
+        """Load the column store, first converting any new rows of source if given."""
+        if source is not None:
+            export(source, columns_dir, catalog)
+        columns, items = load_columns(columns_dir)
+        return cls(columns, items)
+
+    def __len__(self):
+        return len(self.columns["order_id"])
+
+    # ---------------- filtering ----------------
+    def between(self, start, end):
+        """Orders placed in [start, end) (anything np.datetime64 accepts) as a new OrderAnalytics."""
+        placed_at = self.columns["placed_at"]
+        mask = (placed_at >= np.datetime64(start, "s")) & (placed_at < np.datetime64(end, "s"))
+        order_ids = self.columns["order_id"][mask]
+        line_mask = np.isin(self.columns["line_order_id"], order_ids)
+        columns = {}
+        for name, values in self.columns.items():
+            columns[name] = values[line_mask] if name.startswith("line_") else values[mask]
+        return OrderAnalytics(columns, self.items)
+
+    # ---------------- group-bys ----------------
+    def by_item(self):
+        """{item name: (qty, line_cents)} for every item sold."""
+        codes = self.columns["line_item"]
+        size = len(self.items)
+        qty = np.bincount(codes, weights=self.columns["line_qty"], minlength=size)
+        cents = np.bincount(codes, weights=self.columns["line_cents"], minlength=size)
+        return {name: (int(qty[code]), int(cents[code]))
+                for code, name in enumerate(self.items) if qty[code]}
+
+    def _group(self, keys, size):
+        totals = self.columns["total_cents"]
+        counts = np.bincount(keys, minlength=size)
+        revenue = np.bincount(keys, weights=totals, minlength=size).astype(np.int64)
+        return counts, revenue
+
+    def by_hour(self):
+        """(order counts, revenue cents) arrays indexed by hour 0-23."""
+        return self._group(self.hours, 24)
+
+    def by_weekday(self):
+        """(order counts, revenue cents) arrays indexed by weekday, Monday = 0."""
+        return self._group(self.weekdays, 7)
+
+    def by_delivery(self):
+        """(order counts, revenue cents) arrays: index 0 = takeaway, 1 = delivery."""
+        return self._group(self.is_delivery.astype(np.int64), 2)
+
+    def daily_revenue(self):
+        """(days, revenue cents) for every calendar day from first to last order, gaps as 0."""
+        if not len(self):
+            return np.array([], dtype="datetime64[D]"), np.array([], dtype=np.int64)
+        first = self.days.min()
+        offsets = (self.days - first).astype(np.int64)
+        revenue = np.bincount(offsets, weights=self.columns["total_cents"]).astype(np.int64)
+        return first + np.arange(len(revenue)), revenue
+
+    # ---------------- statistics ----------------
+    def rolling_average(self, window=7):
+        """(days, average daily revenue in cents over the last window days)."""
+        days, revenue = self.daily_revenue()
+        sums = np.cumsum(np.concatenate(([0], revenue)))
+        lower = np.maximum(np.arange(1, len(revenue) + 1) - window, 0)
+        counts = np.arange(1, len(revenue) + 1) - lower
+        return days, (sums[1:] - sums[lower]) / counts
+
+    def percentiles(self, column="total_cents", q=(50, 90, 95, 99)):
+        """{percentile: value} of a column (order totals by default)."""
+        values = self.columns[column]
+        if not len(values):
+            return {p: 0 for p in q}
+        return {p: float(value) for p, value in zip(q, np.percentile(values, q))}
+
+    def basket_sizes(self):
+        """Items per order, one entry per order."""
+        order_ids = self.columns["order_id"]
+        positions = np.searchsorted(order_ids, self.columns["line_order_id"])
+        sizes = np.bincount(positions, weights=self.columns["line_qty"], minlength=len(order_ids))
+        return sizes.astype(np.int64)
+
+    # ---------------- reports ----------------
+    def end_of_day(self, day):
+        """Summary dict for one calendar day (YYYY-MM-DD)."""
+        start = np.datetime64(day, "D")
+        today = self.between(start, start + np.timedelta64(1, "D"))
+        counts, revenue = today.by_delivery()
+        sizes = today.basket_sizes()
+        return {
+            "day": str(start),
+            "orders": len(today),
+            "revenue_cents": int(today.columns["total_cents"].sum()),
+            "takeaway": (int(counts[0]), int(revenue[0])),
+            "delivery": (int(counts[1]), int(revenue[1])),
+            "average_items": float(sizes.mean()) if len(sizes) else 0.0,
+            "items": today.by_item(),
+            "percentiles": today.percentiles(),
+        }
+
+    def peak_hours(self, n=3):
+        """The n busiest hours as (hour, order count, revenue cents), busiest first."""
+        counts, revenue = self.by_hour()
+        order = np.argsort(-counts, kind="stable")[:n]
+        return [(int(h), int(counts[h]), int(revenue[h])) for h in order if counts[h]]
+
+
+def main():
+    from takeaway_engine import TakeawayApp
+
+    parser = argparse.ArgumentParser(description="Vectorised order history reports.")
+    parser.add_argument("--csv", default=ORDERS_CSV)
+    parser.add_argument("--dir", default=COLUMNS_DIR)
+    parser.add_argument("--day", help="end-of-day report for YYYY-MM-DD (default: last day with orders)")
+    args = parser.parse_args()
+
+    analytics = OrderAnalytics.load(args.dir, args.csv, TakeawayApp().items_by_name)
+    if not len(analytics):
+        print("No orders yet.")
+        return
+
+    day = args.day or str(analytics.days.max())
+    report = analytics.end_of_day(day)
+    print(f"End of day {report['day']}: {report['orders']} orders, ${format_money(report['revenue_cents'])}")
+    print(f"  Takeaway {report['takeaway'][0]} (${format_money(report['takeaway'][1])}),"
+          f" delivery {report['delivery'][0]} (${format_money(report['delivery'][1])})")
+    print(f"  Average basket {report['average_items']:.2f} items")
+    for name, (qty, cents) in sorted(report["items"].items(), key=lambda entry: -entry[1][0]):
+        print(f"  {name:<20} {qty:>5}  ${format_money(cents)}")
+
+    print("Peak hours (all time)")
+    for hour, count, cents in analytics.peak_hours():
+        print(f"  {hour:02d}:00  {count} orders  ${format_money(cents)}")
+
+    print("Order total percentiles (all time)")
+    for p, value in analytics.percentiles().items():
+        print(f"  p{p}: ${format_money(int(round(value)))}")
+
+    counts, revenue = analytics.by_weekday()
+    print("Revenue by weekday")
+    for index, name in enumerate(WEEKDAYS):
+        print(f"  {name}  {counts[index]:>5} orders  ${format_money(int(revenue[index]))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+# Multi-process deployment of order_service.py, for when one process (one
+# GIL) can't keep up with a busy night across several stores:
+#   - N worker processes each run an OrderService on 127.0.0.1:<base+k> and
+#     own the baskets of the sessions that shard_of() maps to them
+#   - one writer process owns the OrderStore/OrderWriter; workers send it
+#     orders over a multiprocessing queue and get (order_id, error) back
+#   - this (front) process accepts the public connections and forwards each
+#     request to the worker that owns its session (least busy worker for
+#     /menu and /login), restarts workers or the writer if they die, and
+#     serves GET /health with load figures for every process
+#
+#     python order_cluster.py --port 8080 --workers 4
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+from credentials import CredentialStore
+from order_log_index import OrderLogIndex
+from order_service import (OrderService, HTTPError, read_request, write_body,
+                           write_response)
+from order_store import OrderStore
+from order_writer import OrderWriter
+from sessions import DEFAULT_TTL, DEFAULT_MAX_BYTES, shard_of
+from takeaway_engine import TakeawayApp
+
+SUPERVISE_EVERY = 2.0       # seconds between checks that every process is alive
+STATS_TIMEOUT = 2.0         # seconds to wait for a worker's /stats in /health
+WRITER_RESTARTED = "writer-restarted"   # sent to every worker's results queue
+
+
+# ---------------- writer process ----------------
+def writer_main(orders, results, max_batch):
+    """Save orders from every worker through one OrderWriter (one SQLite writer, one CSV)."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)     # the front process decides when to stop
+    order_store = OrderStore()
+    order_writer = OrderWriter(order_store, max_batch=max_batch, log_index=OrderLogIndex())
+
+    def reply(worker, ticket):
+        return lambda order_id, error: results[worker].put((ticket, order_id, error))
+
+    while True:
+        message = orders.get()
+        if message is None:
+            break
+        worker, ticket, order = message
+        order_writer.submit(order, reply(worker, ticket))
+    order_writer.close()        # everything received is on disk before the process exits
+
+
+class RemoteOrderWriter:
+    #Stands in for OrderWriter inside a worker: same submit/pending/close, but
+    #the order is saved by the writer process.
+    def __init__(self, worker, orders, results):
+        self.worker = worker
+        self.orders = orders
+        self.results = results
+        self._tickets = itertools.count()
+        self._callbacks = {}        # ticket -> callback
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="order-results", daemon=True)
+        self._thread.start()
+
+    def submit(self, order, callback=None):
+        # pid in the ticket: a restarted worker must not pick up its predecessor's replies
+        ticket = (os.getpid(), next(self._tickets))
+        with self._lock:
+            self._callbacks[ticket] = callback
+        self.orders.put((self.worker, ticket, order))
+
+    def pending(self):
+        with self._lock:
+            return len(self._callbacks)
+
+    def close(self):
+        self.results.put(None)
+        self._thread.join()
+
+    def _fail_pending(self, error):
+        with self._lock:
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        for callback in callbacks:
+            if callback is not None:
+                callback(None, error)
+
+    def _run(self):
+        while True:
+            message = self.results.get()
+            if message is None:
+                break
+            if message == WRITER_RESTARTED:
+                # Orders the old writer had taken will never be answered
+                self._fail_pending("The order writer restarted; this order may not have been "
+                                   "saved. Check before submitting again.")
+                continue
+            ticket, order_id, error = message
+            with self._lock:
+                callback = self._callbacks.pop(tuple(ticket), None)
+            if callback is not None:
+                callback(order_id, error)
+
+
+# ---------------- worker processes ----------------
+def worker_main(index, count, port, orders, results, session_ttl, max_session_bytes):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    service = OrderService(TakeawayApp(), CredentialStore(), RemoteOrderWriter(index, orders, results),
+                           session_ttl=session_ttl, max_session_bytes=max_session_bytes,
+                           shard=(index, count))
+    asyncio.run(service.serve("127.0.0.1", port))
+
+
+class WorkerHandle:
+    #The front process's view of one worker: its process, a pool of kept-alive
+    #connections to it, and the load the front end has seen.
+    def __init__(self, index, port):
+        self.index = index
+        self.port = port
+        self.process = None
+        self.restarts = 0
+        self.idle = []              # (reader, writer) connections ready for reuse
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0             # failed forwards and 5xx replies
+        self.busy_seconds = 0.0     # total forward time, for the mean latency
+
+    async def forward(self, method, path, body):
+        """Send one request to the worker. Returns (status, body bytes)."""
+        reader, writer = self.idle.pop() if self.idle else \
+            await asyncio.open_connection("127.0.0.1", self.port)
+        try:
+            writer.write(
+                f"{method} {path} HTTP/1.1\r\nHost: worker\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+            )
+            status_line = await reader.readline()
+            status = int(status_line.split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.strip().lower() == "content-length":
+                    length = int(value)
+            reply = await reader.readexactly(length)
+        except BaseException:
+            writer.close()
+            raise
+        self.idle.append((reader, writer))
+        return status, reply
+
+    def drop_connections(self):
+        for reader, writer in self.idle:
+            writer.close()
+        self.idle.clear()
+
+
+# ---------------- front process ----------------
+class OrderCluster:
+    def __init__(self, workers, base_port, session_ttl=DEFAULT_TTL,
+                 max_session_bytes=DEFAULT_MAX_BYTES, max_batch=100):
+        self.session_ttl = session_ttl
+        self.max_session_bytes = max_session_bytes
+        self.max_batch = max_batch
+        self.orders = multiprocessing.Queue()
+        self.results = [multiprocessing.Queue() for _ in range(workers)]
+        self.workers = [WorkerHandle(k, base_port + k) for k in range(workers)]
+        self.writer = None
+        self.writer_restarts = 0
+        self.started = time.monotonic()
+
+    # ---------------- processes ----------------
+    def _start_writer(self):
+        self.writer = multiprocessing.Process(
+            target=writer_main, args=(self.orders, self.results, self.max_batch),
+            name="order-writer", daemon=True)
+        self.writer.start()
+
+    def _start_worker(self, worker):
+        worker.drop_connections()
+        worker.process = multiprocessing.Process(
+            target=worker_main,
+            args=(worker.index, len(self.workers), worker.port, self.orders,
+                  self.results[worker.index], self.session_ttl, self.max_session_bytes),
+            name=f"order-worker-{worker.index}", daemon=True)
+        worker.process.start()
+
+    def start(self):
+        self._start_writer()
+        for worker in self.workers:
+            self._start_worker(worker)
+
+    async def wait_ready(self, timeout=30.0):
+        """Wait until every worker accepts connections."""
+        deadline = time.monotonic() + timeout
+        for worker in self.workers:
+            while True:
+                try:
+                    reader, writer = await asyncio.open_connection("127.0.0.1", worker.port)
+                except OSError:
+                    if time.monotonic() > deadline or not worker.process.is_alive():
+                        raise RuntimeError(f"worker {worker.index} did not start")
+                    await asyncio.sleep(0.05)
+                    continue
+                worker.idle.append((reader, writer))
+                break
+
+    async def supervise(self):
+        """Restart any worker or writer process that has died."""
+        while True:
+            await asyncio.sleep(SUPERVISE_EVERY)
+            if not self.writer.is_alive():
+                self.writer_restarts += 1
+                self._start_writer()
+                for results in self.results:
+                    results.put(WRITER_RESTARTED)
+            for worker in self.workers:
+                if not worker.process.is_alive():
+                    # Its baskets are gone; their sessions will get 404 and log in again
+                    worker.restarts += 1
+                    self._start_worker(worker)
+
+    def stop(self):
+        """Stop the workers, then let the writer save every order it was sent."""
+        for worker in self.workers:
+            worker.idle.clear()     # the event loop that owned them has already closed
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.process.join()
+        self.orders.put(None)
+        self.writer.join()
+
+    # ---------------- routing ----------------
+    def worker_for(self, path):
+        parts = path.split("/")
+        if len(parts) > 2 and parts[1] == "sessions":
+            return self.workers[shard_of(parts[2], len(self.workers))]
+        alive = [w for w in self.workers if w.process.is_alive()] or self.workers
+        return min(alive, key=lambda w: w.in_flight)
+
+    async def forward(self, worker, method, path, body):
+        worker.in_flight += 1
+        worker.requests += 1
+        started = time.perf_counter()
+        try:
+            status, reply = await worker.forward(method, path, body)
+        except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+            status, reply = 503, json.dumps({"error": f"Worker {worker.index} unavailable"}).encode()
+        finally:
+            worker.in_flight -= 1
+            worker.busy_seconds += time.perf_counter() - started
+        if status >= 500:
+            worker.errors += 1
+        return status, reply
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HTTPError as e:
+                    write_response(writer, e.status, {"error": e.message}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                if path == "/health" and method == "GET":
+                    write_response(writer, 200, await self.health(), keep_alive)
+                else:
+                    status, reply = await self.forward(self.worker_for(path), method, path, body)
+                    write_body(writer, status, reply, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # ---------------- health ----------------
+    async def _worker_health(self, worker):
+        alive = worker.process.is_alive()
+        health = {
+            "worker": worker.index,
+            "pid": worker.process.pid,
+            "alive": alive,
+            "restarts": worker.restarts,
+            "in_flight": worker.in_flight,
+            "requests": worker.requests,
+            "errors": worker.errors,
+            "mean_ms": round(1000 * worker.busy_seconds / worker.requests, 2) if worker.requests else None,
+        }
+        if alive:
+            try:
+                status, reply = await asyncio.wait_for(
+                    worker.forward("GET", "/stats", b""), STATS_TIMEOUT)
+                health["stats"] = json.loads(reply)
+            except (OSError, ValueError, IndexError, asyncio.TimeoutError,
+                    asyncio.IncompleteReadError):
+                health["alive"] = False     # running but not answering
+        return health
+
+    async def health(self):
+        workers = await asyncio.gather(*(self._worker_health(w) for w in self.workers))
+        return {
+            "ok": self.writer.is_alive() and all(w["alive"] for w in workers),
+            "uptime_s": round(time.monotonic() - self.started, 1),
+            "writer": {"pid": self.writer.pid, "alive": self.writer.is_alive(),
+                       "restarts": self.writer_restarts, "queued": _queued(self.orders)},
+            "workers": workers,
+        }
+
+    async def serve(self, host, port):
+        await self.wait_ready()
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        supervisor = asyncio.create_task(self.supervise())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            supervisor.cancel()
+
+
+def _queued(q):
+    try:
+        return q.qsize()
+    except NotImplementedError:     # macOS has no sem_getvalue
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-process HTTP/JSON order service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--worker-base-port", type=int, default=None,
+                        help="workers listen on 127.0.0.1 from this port up (default: --port + 1)")
+    parser.add_argument("--session-ttl", type=float, default=DEFAULT_TTL)
+    parser.add_argument("--max-session-mb", type=float, default=DEFAULT_MAX_BYTES / 2**20,
+                        help="memory cap for the baskets in each worker")
+    args = parser.parse_args()
+
+    # One-time imports happen here, before any worker opens the databases
+    credentials = CredentialStore()
+    credentials.import_users_file()
+    credentials.hash_plaintext_records()
+    OrderStore().import_csv(catalog=TakeawayApp().items_by_name)
+
+    cluster = OrderCluster(args.workers, args.worker_base_port or args.port + 1,
+                           session_ttl=args.session_ttl,
+                           max_session_bytes=int(args.max_session_mb * 2**20))
+    cluster.start()
+    print(f"Order service listening on http://{args.host}:{args.port} "
+          f"with {args.workers} workers")
+    try:
+        asyncio.run(cluster.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cluster.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# Columnar export of orders.csv for the back-office dashboards. Each run
+# converts only the rows added since the last run and saves them as one
+# compressed NumPy chunk (.npz) of typed columns:
+#     orders: order_id, placed_at (datetime64[s]), subtotal_cents, delivery_cents, total_cents
+#     lines:  line_order_id, line_item (code into items), line_qty, line_cents
+# The "Items Ordered" text is exploded into the lines table, with item names
+# dictionary-encoded as small integer codes (state.json keeps the names).
+#
+#     python order_columns.py                 (append new orders)
+#     python order_columns.py --rebuild       (start again from the top of the file)
+import argparse
+import csv
+import glob
+import json
+import os
+import shutil
+
+import numpy as np
+
+from order_log_index import file_fingerprint
+from order_store import parse_csv_row, ORDERS_CSV
+from timestamps import TimestampParser
+from order_lines import OrderLineParser
+
+COLUMNS_DIR = "order_columns"
+STATE_NAME = "state.json"
+ORDER_COLUMNS = ("order_id", "placed_at", "subtotal_cents", "delivery_cents", "total_cents")
+LINE_COLUMNS = ("line_order_id", "line_item", "line_qty", "line_cents")
+DTYPES = {
+    "order_id": np.int64,
+    "placed_at": "datetime64[s]",
+    "subtotal_cents": np.int64,
+    "delivery_cents": np.int32,
+    "total_cents": np.int64,
+    "line_order_id": np.int64,
+    "line_item": np.int32,
+    "line_qty": np.int16,
+    "line_cents": np.int64,
+}
+
+
+def empty_state(source):
+    return {
+        "source": os.path.abspath(source),
+        "offset": 0,            # bytes of the CSV already converted
+        "fingerprint": "",      # file_fingerprint(source, offset), to spot a rewritten file
+        "next_order_id": 1,
+        "items": [],            # line_item code -> item name
+        "chunks": 0,
+        "skipped": 0,
+    }
+
+
+def load_state(columns_dir=COLUMNS_DIR):
+    try:
+        with open(os.path.join(columns_dir, STATE_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_state(state, columns_dir=COLUMNS_DIR):
+    tmp_path = os.path.join(columns_dir, STATE_NAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, os.path.join(columns_dir, STATE_NAME))
+
+
+def read_new_rows(path, offset):
+    """Yield (row, end_offset) for each complete CSV line after byte offset.
+
+    A final line without a newline (an order still being written) is left for
+    the next run.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            offset += len(raw)
+            line = raw.decode("utf-8")
+            for row in csv.reader([line]):
+                yield row, offset
+
+
+def export(source=ORDERS_CSV, columns_dir=COLUMNS_DIR, catalog=None, rebuild=False):
+    """Convert orders added to source since the last run. Returns (orders, lines) added."""
+    state = None if rebuild else load_state(columns_dir)
+    if state is not None:
+        try:
+            size = os.path.getsize(source)
+        except OSError:
+            size = 0
+        if (state["source"] != os.path.abspath(source) or size < state["offset"]
+                or file_fingerprint(source, state["offset"]) != state.get("fingerprint")):
+            state = None    # different, truncated or rewritten file: start again
+    if state is None:
+        shutil.rmtree(columns_dir, ignore_errors=True)
+        state = empty_state(source)
+    os.makedirs(columns_dir, exist_ok=True)
+
+    catalog = catalog or {}
+    item_codes = {name: code for code, name in enumerate(state["items"])}
+    parse_time = TimestampParser()
+    parse_lines = OrderLineParser(catalog)
+    orders = {name: [] for name in ORDER_COLUMNS}
+    lines = {name: [] for name in LINE_COLUMNS}
+    header = None
+    offset = state["offset"]
+
+    for row, offset in read_new_rows(source, state["offset"]):
+        if header is None and state["offset"] == 0 and row and row[0] == "Date":
+            header = row
+            continue
+        try:
+            placed_at, order_lines, subtotal, delivery_cost, total = parse_csv_row(
+                dict(zip(("Date", "Items Ordered", "Subtotal", "Delivery", "Total"), row)),
+                catalog, parse_time, parse_lines,
+            )
+        except (ValueError, ArithmeticError, KeyError, AttributeError, TypeError):
+            state["skipped"] += 1
+            continue
+
+        order_id = state["next_order_id"]
+        state["next_order_id"] += 1
+        orders["order_id"].append(order_id)
+        orders["placed_at"].append(placed_at)
+        orders["subtotal_cents"].append(subtotal)
+        orders["delivery_cents"].append(delivery_cost)
+        orders["total_cents"].append(total)
+
+        for item_id, name, qty, line_cents in order_lines:
+            code = item_codes.get(name)
+            if code is None:
+                code = item_codes[name] = len(state["items"])
+                state["items"].append(name)
+            lines["line_order_id"].append(order_id)
+            lines["line_item"].append(code)
+            lines["line_qty"].append(qty)
+            lines["line_cents"].append(line_cents)
+
+    added = len(orders["order_id"])
+    if added:
+        arrays = {name: np.array(values, dtype=DTYPES[name]) for name, values in orders.items()}
+        arrays.update({name: np.array(values, dtype=DTYPES[name]) for name, values in lines.items()})
+        state["chunks"] += 1
+        chunk_path = os.path.join(columns_dir, f"chunk-{state['chunks']:06d}.npz")
+        np.savez_compressed(chunk_path, **arrays)
+
+    state["offset"] = offset
+    state["fingerprint"] = file_fingerprint(source, offset)
+    save_state(state, columns_dir)
+    return added, len(lines["line_order_id"])
+
+
+def load_columns(columns_dir=COLUMNS_DIR):
+    """Load every chunk and return ({column name: array}, item names list)."""
+    state = load_state(columns_dir) or empty_state(ORDERS_CSV)
+    parts = {name: [] for name in ORDER_COLUMNS + LINE_COLUMNS}
+    for chunk_path in sorted(glob.glob(os.path.join(columns_dir, "chunk-*.npz"))):
+        with np.load(chunk_path) as chunk:
+            for name in parts:
+                parts[name].append(chunk[name])
+    columns = {}
+    for name, arrays in parts.items():
+        columns[name] = np.concatenate(arrays) if arrays else np.array([], dtype=DTYPES[name])
+    return columns, state["items"]
+
+
+def main():
+    from takeaway_engine import TakeawayApp
+
+    parser = argparse.ArgumentParser(description="Export orders.csv to compressed NumPy columns.")
+    parser.add_argument("source", nargs="?", default=ORDERS_CSV)
+    parser.add_argument("--dir", default=COLUMNS_DIR, help="output directory")
+    parser.add_argument("--rebuild", action="store_true", help="convert the whole file again")
+    args = parser.parse_args()
+
+    # orders.csv has no line prices, so line_cents uses current menu prices
+    orders, lines = export(args.source, args.dir, TakeawayApp().items_by_name, args.rebuild)
+    state = load_state(args.dir)
+    print(f"Added {orders} orders ({lines} lines) to {args.dir}; "
+          f"{state['chunks']} chunks, {state['skipped']} malformed rows skipped so far.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,41 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
-import csv
-from datetime import datetime
+import queue
+from money import format_money
+from takeaway_engine import DELIVERY_FEE_CENTS, MAX_ITEM_QTY
+from image_cache import ImageCache, ITEM_IMAGE_SIZE
+from image_prefetch import ImagePrefetcher
+from virtual_list import VirtualItemList
 
+VIRTUAL_LIST_THRESHOLD = 50 # categories bigger than this use the scrolling VirtualItemList
+SAVE_POLL_MS = 50           # how often to check for orders the writer has finished saving
 
 
-def place_order_gui(app):
+
+def place_order_gui(app, order_writer, basket=None, on_close=None):
+    # app supplies the menu; basket (a session's CompactBasket) holds this
+    # customer's order, defaulting to the app's own basket. on_close() is
+    # called once the window has been destroyed.
+    if basket is None:
+        basket = app
     window = tk.Toplevel()
     window.title("Place Order")
     window.geometry("850x500")
 
     selected_item = {"item": None}
+    saved_orders = queue.Queue()        # (order, order_id, error) reported by the order writer thread
+    unsaved = {"count": 0}              # orders submitted whose result hasn't come back yet
+    order_rows = {}                     # item name -> widgets for its row in the order panel
+    placeholder = {"label": None}       # "No items ordered yet." label, created once
+    image_cache = ImageCache()
+    prefetcher = ImagePrefetcher(window, image_cache)
+
+    def on_destroy(event):
+        if event.widget is window:
+            prefetcher.close()
+            if on_close is not None:
+                on_close()
+    window.bind("<Destroy>", on_destroy)
     delivery_option = tk.StringVar(value="Takeaway")
     # make the order summary auto-update when delivery option changes
     delivery_option.trace_add("write", lambda *args: update_order_display())
@@ -26,17 +50,12 @@ def place_order_gui(app):
         selected_item["item"] = item
         selected_label.config(text=f"{item.name} (${item.price:.2f})")
 
-        try:
-            if item.image_path:
-                img = Image.open(item.image_path)
-            else:
-                img = Image.open("images/no_image.png")
-
-            img = img.resize((200, 150), Image.Resampling.LANCZOS)
-            photo = ImageTk.PhotoImage(img)
+        # Pictures are decoded and resized once, then served from the cache
+        photo = image_cache.get(item.image_path, ITEM_IMAGE_SIZE)
+        if photo is not None:
             image_label.config(image=photo, text="", width=200, height=150)
             image_label.image = photo
-        except Exception:
+        else:
             image_label.config(image="", text="No Image", width=200, height=150)
 
     def add_item_to_order():      #Adds the currently selected item to the order with the specified quantity.
@@ -54,89 +73,144 @@ def place_order_gui(app):
             return
 
         # Global quantity check
-        current_qty = app.get_item_quantity(item.item_id)
+        current_qty = basket.get_item_quantity(item.item_id)
         total_qty = current_qty + qty
-        if total_qty > 10:
-            messagebox.showwarning("Quantity Limit", f"You can only order a maximum of 10 {item.name}.") # error message if total qty exceeds 10
+        if total_qty > MAX_ITEM_QTY:
+            messagebox.showwarning("Quantity Limit", f"You can only order a maximum of {MAX_ITEM_QTY} {item.name}.") # error message if total qty exceeds 10
             return
 
-        app.add_to_order(item.item_id, qty)
+        basket.add_to_order(item.item_id, qty)
         qty_entry.delete(0, tk.END)
         update_order_display()
 
+    def change_quantity(name, step):        #Used by the +/- buttons: reads the current qty when clicked.
+        item = app.find_item_by_name(name)
+        current_qty = basket.get_item_quantity(item.item_id) if item else 0
+        new_qty = max(0, min(current_qty + step, MAX_ITEM_QTY))   # capped between 0 (removes the line) and 10
+        basket.update_item_quantity(name, new_qty)
+        update_order_display()
+
+    def create_order_row(name):             #Builds the Frame, Label and +/- Buttons for one order line.
+        row = tk.Frame(order_list_frame, bg="lightgrey")
+        row.pack(fill="x", pady=2)  # Small vertical padding between items
+
+        label = tk.Label(row, bg="lightgrey")
+        label.pack(side="left")
+
+        # "+" button (capped at 10)
+        tk.Button(
+            row,
+            text="+",
+            highlightbackground="lightgrey",
+            command=lambda n=name: change_quantity(n, 1)
+        ).pack(side="right", padx=2)
+
+        # "-" button (auto-remove at 0)
+        tk.Button(
+            row,
+            text="-",
+            highlightbackground="lightgrey",
+            command=lambda n=name: change_quantity(n, -1)
+        ).pack(side="right", padx=2)
+
+        return {"frame": row, "label": label, "line": None}
+
     def update_order_display():             #Refreshes the order summary display and updates cost labels.
-        for widget in order_list_frame.winfo_children():
-            widget.destroy()
+        # Rows are kept between refreshes; only lines that changed are touched
+        current = {}
+        for name, qty, cost in basket.order:
+            current[name] = (qty, cost)
+
+        # Remove rows for lines that have left the order
+        for name in list(order_rows):
+            if name not in current:
+                order_rows.pop(name)["frame"].destroy()
+
+        # Add rows for new lines, and relabel rows whose qty/cost changed
+        for name, line in current.items():
+            row = order_rows.get(name)
+            if row is None:
+                row = order_rows[name] = create_order_row(name)
+            if row["line"] != line:
+                qty, cost = line
+                row["label"].config(text=f"{qty} x {name} - ${format_money(cost)}")
+                row["line"] = line
+
         # Display placeholder if no items ordered
-        if not app.order:
-            tk.Label(order_list_frame, text="No items ordered yet.", fg="black", bg="lightgrey").pack(anchor="w")
+        if placeholder["label"] is None:
+            placeholder["label"] = tk.Label(order_list_frame, text="No items ordered yet.", fg="black", bg="lightgrey")
+        if not current:
+            placeholder["label"].pack(anchor="w")
         else:
-            for name, qty, cost in app.order:
-                row = tk.Frame(order_list_frame, bg="lightgrey")
-                row.pack(fill="x", pady=2)  # Small vertical padding between items
-
-                tk.Label(row, text=f"{qty} x {name} - ${cost:.2f}", bg="lightgrey").pack(side="left")
-
-                # "+" button (capped at 10)
-                tk.Button(
-                    row,
-                    text="+",
-                    highlightbackground="lightgrey",
-                    command=lambda n=name, q=qty: (
-                        app.update_item_quantity(n, min(q + 1, 10)), update_order_display()  # the "min" function chooses the smaller value therefore capping qty at 10.
-                    ) #lambda to capture current name and qty only when clicked. 
-                ).pack(side="right", padx=2)
-
-                # "-" button (auto-remove at 0)
-                tk.Button(
-                    row,
-                    text="-",
-                    highlightbackground="lightgrey",
-                    command=lambda n=name, q=qty: (
-                        app.update_item_quantity(n, max(q - 1, 0)), update_order_display() #the "max" module chooses the larger value therefore  qty at 10.
-                    )
-                ).pack(side="right", padx=2)
-
-        subtotal = app.total_cost 
-        delivery_cost = 5.00 if delivery_option.get() == "Delivery" else 0.00
+            placeholder["label"].pack_forget()
+
+        subtotal = basket.subtotal_cents        # all amounts are in cents
+        delivery_cost = DELIVERY_FEE_CENTS if delivery_option.get() == "Delivery" else 0
         total = subtotal + delivery_cost
 
-        subtotal_label.config(text=f"Subtotal: ${subtotal:.2f}")
-        delivery_label.config(text=f"Delivery: ${delivery_cost:.2f}")
-        total_label.config(text=f"Total: ${total:.2f}")
+        subtotal_label.config(text=f"Subtotal: ${format_money(subtotal)}")
+        delivery_label.config(text=f"Delivery: ${format_money(delivery_cost)}")
+        total_label.config(text=f"Total: ${format_money(total)}")
 
     def submit_order():            #Finalizes the order, saves to CSV, and shows confirmation.
-        if not app.order:
+        if not basket.order:
             messagebox.showwarning("No Order", "You haven't added anything to your order.")      # If no items in order, show warning and exit function
             return
 
-        subtotal = app.total_cost
-        delivery_cost = 5.00 if delivery_option.get() == "Delivery" else 0.00            # Delivery fee is $5 if delivery selected, otherwise $0
-        total = subtotal + delivery_cost                     
+        # Delivery fee is $5 if delivery selected, otherwise $0
+        order = basket.build_order(delivery=delivery_option.get() == "Delivery")
+        placed_at, lines, subtotal, delivery_cost, total = order
 
         # Format the order summary for the messagebox
-        summary = app.get_order_summary()
-        summary += f"\nDelivery: ${delivery_cost:.2f}\nTotal: ${total:.2f}"
-
-        # --- CSV Saving Logic ---
-        order_items = "; ".join([f"{qty}x {name}" for name, qty, cost in app.order])           
-        order_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")                # Current date and time
-        csv_data = [order_time, order_items, f"{subtotal:.2f}", f"{delivery_cost:.2f}", f"{total:.2f}"] # Data row to write to CSV
+        summary = basket.get_order_summary()
+        summary += f"\nDelivery: ${format_money(delivery_cost)}\nTotal: ${format_money(total)}"
 
-        # Write to CSV (creates if doesn't exist)
+        # --- Hand the order to the background writer (order store + orders.csv) ---
         try:
-            with open("orders.csv", "a", newline="", encoding="utf-8") as file:
-                writer = csv.writer(file)
-                # Write header if file is empty
-                if file.tell() == 0:
-                    writer.writerow(["Date", "Items Ordered", "Subtotal", "Delivery", "Total"])
-                writer.writerow(csv_data)
-        except Exception as e:
-            messagebox.showerror("File Error", f"Could not save order to CSV:\n{e}")
+            order_writer.submit(order, lambda order_id, error: saved_orders.put((order, order_id, error)))
+        except RuntimeError as e:
+            messagebox.showerror("Save Error", f"Could not save order:\n{e}")
             return
+        save_status_label.config(text="Saving order...")
+        unsaved["count"] += 1
+        if unsaved["count"] == 1:       # otherwise check_saved_orders is already polling
+            window.after(SAVE_POLL_MS, check_saved_orders)
+
+        # Start a fresh basket (this also clears the crash journal); if the
+        # save fails, check_saved_orders puts the lines back
+        basket.clear_order()
+        update_order_display()
 
         messagebox.showinfo("Order Confirmation", f"Your order has been placed!\n\n{summary}") # Show confirmation with order summary
 
+    def restore_order(order):       #Puts the lines of an order that failed to save back in the basket.
+        for item_id, name, qty, cost in order[1]:
+            # Merge with anything added since, within the per-item limit
+            qty = min(qty, MAX_ITEM_QTY - basket.get_item_quantity(item_id))
+            if qty > 0:
+                basket.add_to_order(item_id, qty)
+        update_order_display()
+
+    def check_saved_orders():       #Runs on the Tk thread: shows results reported by the writer thread.
+        while True:
+            try:
+                order, order_id, error = saved_orders.get_nowait()
+            except queue.Empty:
+                break
+            unsaved["count"] -= 1
+            if order_id is None:
+                restore_order(order)
+                save_status_label.config(text="Order NOT saved!")
+                messagebox.showerror("Save Error", f"{error}\n\nThe items have been put back in your basket.")
+            elif error:
+                save_status_label.config(text=f"Order #{order_id} saved")
+                messagebox.showerror("Save Error", error)
+            else:
+                save_status_label.config(text=f"Order #{order_id} saved")
+        # Keep polling until every order has reported back, however slow the disk is
+        if unsaved["count"] > 0:
+            window.after(SAVE_POLL_MS, check_saved_orders)
+
 
     # -------------------- BANNER FRAME --------------------
     banner_frame = tk.Frame(window, bg="#d13f5c", height=60)
@@ -193,26 +267,62 @@ def place_order_gui(app):
     menu_items_frame = tk.Frame(menu_frame, bg="beige") 
     menu_items_frame.pack(fill="both", expand=True)
 
-    # Function that displays the items for the currently selected category
-    def show_category(event=None):   
-        selected_category = category_dropdown.get()  # Get which category was selected
-        items = app.menu[selected_category]          # Fetch list of MenuItem objects in that category
-        
-        # Clear existing item buttons (so it refreshes when user changes category)
-        for widget in menu_items_frame.winfo_children():
-            widget.destroy()
+    # Each category's buttons are built once and kept in their own frame;
+    # switching category just swaps which frame is packed.
+    category_panels = {}            # category -> {"frame": Frame, "version": menu version it was built from}
+    shown_panel = {"frame": None}
+    virtual_list = {"widget": None}  # shared by every large category, created on first use
 
-        # Create a button for each item in the selected category
-        for item in items:
+    def build_category_panel(category):
+        panel = tk.Frame(menu_items_frame, bg="beige")
+        # Create a button for each item in the category
+        for item in app.menu[category]:
             btn = tk.Button(
-                menu_items_frame,
+                panel,
                 text=f"{item.name} - ${item.price:.2f}",  # Display name and formatted price
                 fg="black",
                 highlightthickness=5,     # Makes button edges more visible
                 highlightbackground="beige",  # beige border color will blend into the frame
                 command=lambda i=item: select_item(i)  # When clicked, item is selected 
             )
-            btn.pack(pady=5, fill="x")   
+            btn.pack(pady=5, fill="x")
+        return panel
+
+    # Function that displays the items for the currently selected category
+    def show_category(event=None):   
+        selected_category = category_dropdown.get()  # Get which category was selected
+        items = app.menu[selected_category]          # Fetch list of MenuItem objects in that category
+
+        if len(items) > VIRTUAL_LIST_THRESHOLD:
+            # Large category: only the visible rows get widgets
+            if virtual_list["widget"] is None:
+                virtual_list["widget"] = VirtualItemList(menu_items_frame, on_select=select_item)
+            panel = virtual_list["widget"]
+            panel.set_items(items)
+        else:
+            # Reuse the cached panel unless this category's menu data has changed
+            version = app.category_version(selected_category)
+            cached = category_panels.get(selected_category)
+            if cached is not None and cached["version"] != version:
+                cached["frame"].destroy()
+                cached = None
+            if cached is None:
+                cached = {"frame": build_category_panel(selected_category), "version": version}
+                category_panels[selected_category] = cached
+            panel = cached["frame"]
+
+        if shown_panel["frame"] is not panel:
+            if shown_panel["frame"] is not None and shown_panel["frame"].winfo_exists():
+                shown_panel["frame"].pack_forget()
+            panel.pack(fill="both", expand=True)
+            shown_panel["frame"] = panel
+
+        # Load this category's pictures (then the next category's) in the background
+        categories = list(app.menu.keys())
+        next_category = categories[(categories.index(selected_category) + 1) % len(categories)]
+        # (only the first rows of large categories, the rest load when clicked)
+        prefetcher.prefetch([item.image_path for item in items[:VIRTUAL_LIST_THRESHOLD]])
+        prefetcher.prefetch([item.image_path for item in app.menu[next_category][:VIRTUAL_LIST_THRESHOLD]])
 
 
     # When the user picks a new category from the dropdown, it runs the show_category() function
@@ -274,4 +384,7 @@ def place_order_gui(app):
     )
     submit_btn.pack(pady=15, fill="x", padx=10)
 
+    save_status_label = tk.Label(order_frame, text="", fg="black", bg="lightgrey")
+    save_status_label.pack(anchor="w", padx=10)
+
     update_order_display()
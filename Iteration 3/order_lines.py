@@ -0,0 +1,73 @@
+# Parser for the "Items Ordered" text in orders.csv ("2x Burger; 1x Fries").
+# Each entry becomes a compact (item_id, name, qty, line_cents) tuple:
+#   - names are the catalog's own MenuItem.name strings (unknown names go
+#     through sys.intern), so millions of records share a handful of strings
+#   - the item is resolved with one dict lookup on the name
+#   - entries repeat a lot ("1x Cola"), so each distinct entry string is parsed
+#     once and the same tuple is handed back after that
+# Malformed entries are reported to the caller and skipped, never raised.
+import sys
+
+SEPARATOR = ";"
+MAX_CACHED_ENTRIES = 50000
+
+
+class OrderLineParser:
+    def __init__(self, catalog=None):
+        self.catalog = catalog or {}    # item name -> MenuItem
+        self._cache = {}                # raw entry text -> record
+        self.unknown_names = set()      # names not on the menu (kept, with item_id None)
+
+    def parse_entry(self, entry):
+        """Parse one "2x Burger" entry. Returns a record, or a str saying what is wrong."""
+        record = self._cache.get(entry)
+        if record is not None:
+            return record
+
+        qty_text, sep, name = entry.partition("x")
+        qty_text = qty_text.strip()
+        name = name.strip()
+        if not sep or not qty_text.isdigit():
+            return "expected '<qty>x <item name>'"
+        if not name:
+            return "missing item name"
+        qty = int(qty_text)
+        if qty <= 0:
+            return "quantity must be positive"
+
+        item = self.catalog.get(name)
+        if item is not None:
+            record = (item.item_id, item.name, qty, qty * item.price_cents)
+        else:
+            name = sys.intern(name)
+            self.unknown_names.add(name)
+            record = (None, name, qty, 0)
+
+        if len(self._cache) >= MAX_CACHED_ENTRIES:
+            self._cache.clear()
+        self._cache[entry] = record
+        return record
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    def parse(self, text, errors=None):
+        """Parse a whole "Items Ordered" field into a list of records.
+
+        Bad entries are skipped; if errors is a list, (entry, reason) pairs are
+        appended to it.
+        """
+        records = []
+        for entry in text.split(SEPARATOR):
+            result = self.parse_entry(entry)
+            if result.__class__ is tuple:
+                records.append(result)
+            elif entry.strip():
+                if errors is not None:
+                    errors.append((entry.strip(), result))
+        return records
+
+
+def format_lines(lines):
+    """The inverse: records or (item_id, name, qty, ...) tuples -> "2x Burger; 1x Fries"."""
+    return "; ".join(f"{line[2]}x {line[1]}" for line in lines)
@@ -0,0 +1,191 @@
+# Random access into a large orders.csv without reading the whole file. The
+# file is memory-mapped and a sparse index (saved next to it as
+# orders.csv.idx) records the byte offset and timestamp of every Nth order:
+#   - row(n) jumps to the nearest checkpoint and skips at most N-1 lines
+#   - rows_between(start, end) binary-searches the checkpoint times, so
+#     "yesterday's orders" only touches the part of the file that holds them
+# The index is extended incrementally as orders are appended (OrderWriter
+# calls refresh() after each batch).
+import bisect
+import csv
+import hashlib
+import json
+import mmap
+import os
+from datetime import datetime, timedelta
+
+from timestamps import TimestampParser, to_iso
+
+ORDERS_CSV = "orders.csv"
+INDEX_EVERY = 1000      # one checkpoint per this many orders
+HEADER_PREFIX = b"Date,"
+FINGERPRINT_BYTES = 256
+
+
+def file_fingerprint(path, end):
+    """Hash of the start of path and of the bytes just before offset end.
+
+    Appending leaves it unchanged; rewriting the file (e.g. timestamps.py
+    turning dates into longer ISO strings) almost always changes it, even
+    when the file only grew, so a saved offset is known to be stale.
+    """
+    if end <= 0:
+        return ""
+    digest = hashlib.sha1()
+    try:
+        with open(path, "rb") as f:
+            digest.update(f.read(min(end, FINGERPRINT_BYTES)))
+            f.seek(max(0, end - FINGERPRINT_BYTES))
+            digest.update(f.read(min(end, FINGERPRINT_BYTES)))
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+class OrderLogIndex:
+    def __init__(self, csv_path=ORDERS_CSV, every=INDEX_EVERY, index_path=None):
+        self.csv_path = csv_path
+        self.index_path = index_path or csv_path + ".idx"
+        self.every = every
+        self._parse_time = TimestampParser()
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.rows = 0           # complete order rows covered by the index
+        self.end = 0            # byte offset just past the last indexed row
+        self.offsets = []       # byte offset of rows 0, every, 2*every, ...
+        self.times = []         # ISO timestamp of those rows (sorts as text)
+        self.fingerprint = ""   # file_fingerprint(csv_path, end) when last indexed
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("every") != self.every:
+            return      # built with a different spacing: rebuild
+        self.rows, self.end = data["rows"], data["end"]
+        self.offsets, self.times = data["offsets"], data["times"]
+        self.fingerprint = data.get("fingerprint")
+
+    def _save(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"every": self.every, "rows": self.rows, "end": self.end,
+                       "offsets": self.offsets, "times": self.times,
+                       "fingerprint": self.fingerprint}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _map(self):
+        """Open the CSV as a read-only mmap, or return None if it is empty/missing."""
+        try:
+            with open(self.csv_path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return None
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+
+    def _time_of(self, line):
+        """ISO time of a row, or None if its Date can't be read."""
+        try:
+            row = next(csv.reader([line.decode("utf-8")]))
+            return to_iso(self._parse_time(row[0]))
+        except (ValueError, IndexError, StopIteration):
+            return None
+
+    # ---------------- building ----------------
+    def refresh(self):
+        """Index any complete rows appended since the last call. Returns rows added."""
+        mm = self._map()
+        if mm is None:
+            self._reset()
+            return 0
+        with mm:
+            reset = len(mm) < self.end or file_fingerprint(self.csv_path, self.end) != self.fingerprint
+            if reset:
+                self._reset()       # file was truncated or rewritten: start again
+            pos, added = self.end, 0
+            while True:
+                newline = mm.find(b"\n", pos)
+                if newline == -1:
+                    break           # no complete line left (an order may be mid-write)
+                line = mm[pos:newline]
+                if pos == 0 and line.startswith(HEADER_PREFIX):
+                    pos = newline + 1
+                    continue
+                if line.strip():
+                    if self.rows % self.every == 0:
+                        # A damaged Date takes the previous checkpoint's time, so
+                        # times stays sorted and the row still counts
+                        stamp = self._time_of(line) or (self.times[-1] if self.times else "")
+                        self.offsets.append(pos)
+                        self.times.append(stamp)
+                    self.rows += 1
+                    added += 1
+                pos = newline + 1
+            self.end = pos
+        if added or reset:      # reads call this every time: only write when something changed
+            self.fingerprint = file_fingerprint(self.csv_path, self.end)
+            self._save()
+        return added
+
+    # ---------------- reading ----------------
+    def _rows_from(self, mm, pos, limit):
+        """Yield (byte offset, csv row) for data rows starting at pos, up to byte limit."""
+        while pos < limit:
+            newline = mm.find(b"\n", pos, limit)
+            if newline == -1:
+                break
+            line = mm[pos:newline]
+            if line.strip():
+                yield pos, next(csv.reader([line.decode("utf-8")]))
+            pos = newline + 1
+
+    def row(self, n):
+        """Return order row n (0 = first order) as a list of fields."""
+        self.refresh()
+        if not 0 <= n < self.rows:
+            raise IndexError(f"row {n} out of range (0-{self.rows - 1})")
+        mm = self._map()
+        with mm:
+            start = self.offsets[n // self.every]
+            for skipped, (_, row) in enumerate(self._rows_from(mm, start, self.end)):
+                if skipped == n % self.every:
+                    return row
+        raise IndexError(n)
+
+    def rows_between(self, start, end):
+        """Yield the rows whose Date is in [start, end). start/end are datetimes or ISO strings.
+
+        Assumes orders are appended in time order, as submit_order does.
+        """
+        self.refresh()
+        start = to_iso(start) if isinstance(start, datetime) else start
+        end = to_iso(end) if isinstance(end, datetime) else end
+        # Last checkpoint strictly before start: the first matching row is after it
+        checkpoint = max(bisect.bisect_left(self.times, start) - 1, 0)
+        if not self.offsets:
+            return
+        mm = self._map()
+        with mm:
+            for _, row in self._rows_from(mm, self.offsets[checkpoint], self.end):
+                try:
+                    stamp = to_iso(self._parse_time(row[0]))
+                except (ValueError, IndexError):
+                    continue        # skip a damaged row, as sales_report does
+                if stamp >= end:
+                    break
+                if stamp >= start:
+                    yield row
+
+    def orders_on(self, day):
+        """Rows for one calendar day (a date or datetime)."""
+        start = datetime(day.year, day.month, day.day)
+        return list(self.rows_between(start, start + timedelta(days=1)))
+
+    def __len__(self):
+        self.refresh()
+        return self.rows
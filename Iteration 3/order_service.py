@@ -0,0 +1,393 @@
+# Headless HTTP/JSON service over the order engine, so web and kiosk
+# front-ends can share one back end instead of each running a Tk window.
+# Plain asyncio (no extra packages); every logged-in session gets its own
+# basket, all sharing one copy of the menu. Baskets left idle longer than
+# --session-ttl are dropped (see sessions.py).
+#
+#     python order_service.py --port 8080
+#
+#   GET    /menu                                  categories and items
+#   GET    /stats                                 sessions, memory and load for this process
+#   POST   /login               {"username", "password"}  -> {"session_id"}
+#   DELETE /sessions/<sid>                        log out, drop the basket
+#   GET    /sessions/<sid>/basket
+#   POST   /sessions/<sid>/items {"item_id", "quantity"}  add_to_order
+#   PUT    /sessions/<sid>/items/<item_id> {"quantity"}   update_item_quantity
+#   DELETE /sessions/<sid>/items/<item_id>        remove the line
+#   POST   /sessions/<sid>/submit {"delivery": true/false}
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from urllib.parse import urlsplit
+
+from credentials import CredentialStore
+from money import format_money
+from order_log_index import OrderLogIndex
+from order_store import OrderStore
+from order_writer import OrderWriter
+from sessions import SessionManager, DEFAULT_TTL, DEFAULT_MAX_BYTES
+from takeaway_engine import TakeawayApp, MAX_ITEM_QTY
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_HEADER_LINES = 100
+SAVE_TIMEOUT = 30.0         # seconds to wait for the order writer before giving up on a submit
+STATUS_TEXT = {
+    200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized",
+    404: "Not Found", 405: "Method Not Allowed", 409: "Conflict",
+    413: "Payload Too Large", 500: "Internal Server Error", 502: "Bad Gateway",
+    503: "Service Unavailable", 504: "Gateway Timeout",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# ---------------- HTTP plumbing ----------------
+async def read_request(reader):
+    """Read one HTTP/1.1 request. Returns (method, path, headers, body) or None at EOF."""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise HTTPError(400, "Too many headers")
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(400, "Bad Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), urlsplit(target).path, headers, body
+
+
+def write_response(writer, status, payload, keep_alive=True):
+    write_body(writer, status, json.dumps(payload).encode("utf-8"), keep_alive)
+
+
+def write_body(writer, status, body, keep_alive=True):
+    """Write a response whose JSON body is already encoded."""
+    head = (
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+
+
+def parse_json(body):
+    if not body:
+        return {}
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise HTTPError(400, "Body must be JSON")
+    if not isinstance(data, dict):
+        raise HTTPError(400, "Body must be a JSON object")
+    return data
+
+
+def int_field(data, name):
+    value = data.get(name)
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise HTTPError(400, f"'{name}' must be an integer")
+    return value
+
+
+# ---------------- JSON views ----------------
+def menu_json(catalog):
+    return {
+        category: [
+            {"item_id": item.item_id, "name": item.name, "price_cents": item.price_cents,
+             "price": format_money(item.price_cents), "image_path": item.image_path}
+            for item in items
+        ]
+        for category, items in catalog.menu.items()
+    }
+
+
+def basket_json(basket):
+    return {
+        "lines": [
+            {"item_id": item_id, "name": name, "qty": qty, "line_cents": cost}
+            for item_id, name, qty, cost in basket.order_lines()
+        ],
+        "subtotal_cents": basket.subtotal_cents,
+        "subtotal": format_money(basket.subtotal_cents),
+    }
+
+
+# ---------------- service ----------------
+class OrderService:
+    def __init__(self, catalog, credentials, order_writer,
+                 session_ttl=DEFAULT_TTL, max_session_bytes=DEFAULT_MAX_BYTES, shard=None,
+                 save_timeout=SAVE_TIMEOUT):
+        self.catalog = catalog              # TakeawayApp holding the shared menu
+        self.credentials = credentials
+        self.order_writer = order_writer
+        self.save_timeout = save_timeout
+        self.sessions = SessionManager(catalog, ttl=session_ttl, max_bytes=max_session_bytes,
+                                       shard=shard)
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0                     # 5xx responses
+        self.routes = [
+            ("GET", re.compile(r"/menu$"), self.get_menu),
+            ("GET", re.compile(r"/stats$"), self.get_stats),
+            ("POST", re.compile(r"/login$"), self.login),
+            ("DELETE", re.compile(r"/sessions/([\w-]+)$"), self.logout),
+            ("GET", re.compile(r"/sessions/([\w-]+)/basket$"), self.get_basket),
+            ("POST", re.compile(r"/sessions/([\w-]+)/items$"), self.add_item),
+            ("PUT", re.compile(r"/sessions/([\w-]+)/items/(\d+)$"), self.update_item),
+            ("DELETE", re.compile(r"/sessions/([\w-]+)/items/(\d+)$"), self.remove_item),
+            ("POST", re.compile(r"/sessions/([\w-]+)/submit$"), self.submit),
+        ]
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except HTTPError as e:
+                    write_response(writer, e.status, {"error": e.message}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self.dispatch(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, path, body):
+        """Route a request. Returns (status, JSON payload)."""
+        self.requests += 1
+        status, payload = await self._route(method, path, body)
+        if status >= 500:
+            self.errors += 1
+        return status, payload
+
+    async def _route(self, method, path, body):
+        path_matched = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match is None:
+                continue
+            path_matched = True
+            if route_method != method:
+                continue
+            try:
+                return await handler(parse_json(body), *match.groups())
+            except HTTPError as e:
+                return e.status, {"error": e.message}
+            except Exception as e:
+                return 500, {"error": f"{type(e).__name__}: {e}"}
+        if path_matched:
+            return 405, {"error": "Method not allowed"}
+        return 404, {"error": "Not found"}
+
+    def _session(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise HTTPError(404, "Unknown or expired session")
+        return session
+
+    def _basket_to_change(self, session_id):
+        session = self._session(session_id)
+        # The order being saved was built from this basket, and it is cleared
+        # once the save finishes, so a change made now would be lost
+        if session.submitting:
+            raise HTTPError(409, "This basket is being submitted")
+        return session.basket
+
+    def _item(self, item_id):
+        item = self.catalog.get_item(int(item_id))
+        if item is None:
+            raise HTTPError(404, f"No menu item {item_id}")
+        return item
+
+    # ---------------- handlers ----------------
+    async def get_menu(self, data):
+        return 200, menu_json(self.catalog)
+
+    async def get_stats(self, data):
+        return 200, {
+            "pid": os.getpid(),
+            "uptime_s": round(time.monotonic() - self.started, 1),
+            "cpu_s": round(time.process_time(), 2),
+            "requests": self.requests,
+            "errors": self.errors,
+            "sessions": len(self.sessions),
+            "sessions_evicted": self.sessions.evicted,
+            "session_bytes": self.sessions.memory_estimate(),
+            "orders_pending": self.order_writer.pending(),
+        }
+
+    async def login(self, data):
+        username, password = data.get("username"), data.get("password")
+        if not isinstance(username, str) or not isinstance(password, str):
+            raise HTTPError(400, "'username' and 'password' are required")
+        record = self.credentials.get_record(username)
+        # The hash check is slow on purpose: keep it off the event loop
+        loop = asyncio.get_running_loop()
+        valid, new_record = await loop.run_in_executor(
+            None, self.credentials.check_password, username, password, record)
+        if not valid:
+            raise HTTPError(401, "Invalid username or password")
+        if new_record is not None:
+            self.credentials.set_record(username, new_record)   # upgrade old/weaker hashes
+        session = self.sessions.create(username)
+        return 201, {"session_id": session.session_id}
+
+    async def logout(self, data, session_id):
+        if not self.sessions.close(session_id):
+            raise HTTPError(404, "Unknown or expired session")
+        return 200, {"ok": True}
+
+    async def get_basket(self, data, session_id):
+        return 200, basket_json(self._session(session_id).basket)
+
+    async def add_item(self, data, session_id):
+        basket = self._basket_to_change(session_id)
+        item = self._item(int_field(data, "item_id"))
+        quantity = int_field(data, "quantity")
+        if quantity <= 0:
+            raise HTTPError(400, "'quantity' must be positive")
+        if not basket.add_to_order(item.item_id, quantity):
+            raise HTTPError(409, f"You can only order a maximum of {MAX_ITEM_QTY} {item.name}.")
+        return 200, basket_json(basket)
+
+    async def update_item(self, data, session_id, item_id):
+        basket = self._basket_to_change(session_id)
+        item = self._item(item_id)
+        quantity = int_field(data, "quantity")
+        if not 0 <= quantity <= MAX_ITEM_QTY:
+            raise HTTPError(409, f"Quantity must be between 0 and {MAX_ITEM_QTY}.")
+        if basket.get_item_quantity(item.item_id) == 0:
+            raise HTTPError(404, f"{item.name} is not in the basket")
+        basket.update_item_quantity(item.name, quantity)
+        return 200, basket_json(basket)
+
+    async def remove_item(self, data, session_id, item_id):
+        basket = self._basket_to_change(session_id)
+        item = self._item(item_id)
+        basket.update_item_quantity(item.name, 0)
+        return 200, basket_json(basket)
+
+    async def submit(self, data, session_id):
+        session = self._session(session_id)
+        basket = session.basket
+        if not basket.order:
+            raise HTTPError(409, "The basket is empty")
+        if session.submitting:
+            raise HTTPError(409, "This basket is already being submitted")
+
+        order = basket.build_order(delivery=bool(data.get("delivery", False)))
+        loop = asyncio.get_running_loop()
+        saved = loop.create_future()
+
+        def on_saved(order_id, error):
+            # Called on the writer thread; hand the result to the event loop
+            loop.call_soon_threadsafe(
+                lambda: saved.done() or saved.set_result((order_id, error))
+            )
+
+        session.submitting = True
+        try:
+            self.order_writer.submit(order, on_saved)
+            # Bounded, so a writer that never answers can't pin the session
+            # (a submitting session is never evicted)
+            order_id, error = await asyncio.wait_for(saved, self.save_timeout)
+        except asyncio.TimeoutError:
+            raise HTTPError(504, "Saving the order timed out; it may still be saved. "
+                                 "Check before submitting again.")
+        finally:
+            session.submitting = False
+        if order_id is None:
+            raise HTTPError(500, error)
+
+        basket.clear_order()
+        placed_at, lines, subtotal, delivery_cost, total = order
+        return 201, {
+            "order_id": order_id,
+            "subtotal_cents": subtotal,
+            "delivery_cents": delivery_cost,
+            "total_cents": total,
+            "total": format_money(total),
+            "warning": error,       # e.g. saved to the database but not to orders.csv
+        }
+
+    async def evict_sessions(self, every=60):
+        """Drop idle sessions every `every` seconds, so abandoned baskets don't pile up."""
+        while True:
+            await asyncio.sleep(every)
+            self.sessions.evict_idle()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        evictor = asyncio.create_task(self.evict_sessions(min(60, self.sessions.ttl)))
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            evictor.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/JSON order service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--session-ttl", type=float, default=DEFAULT_TTL,
+                        help="seconds before an idle basket is dropped (default: %(default)s)")
+    parser.add_argument("--max-session-mb", type=float, default=DEFAULT_MAX_BYTES / 2**20,
+                        help="memory cap for all baskets; least recently used go first")
+    args = parser.parse_args()
+
+    catalog = TakeawayApp()
+    credentials = CredentialStore()
+    credentials.import_users_file()
+    credentials.hash_plaintext_records()
+    order_store = OrderStore()
+    order_store.import_csv(catalog=catalog.items_by_name)
+    order_writer = OrderWriter(order_store, log_index=OrderLogIndex())
+
+    service = OrderService(catalog, credentials, order_writer, session_ttl=args.session_ttl,
+                           max_session_bytes=int(args.max_session_mb * 2**20))
+    print(f"Order service listening on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        order_writer.close()    # every accepted order is written before exit
+
+
+if __name__ == "__main__":
+    main()
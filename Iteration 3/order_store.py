@@ -0,0 +1,239 @@
+# SQLite order store. Orders and their lines live in proper tables (instead of
+# a "2x Burger; 1x Fries" string), with indexes on the order time and on the
+# item, so reports don't have to re-read the whole history.
+import contextlib
+import csv
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+from datetime import datetime
+
+from money import to_cents
+from timestamps import TimestampParser
+from order_lines import OrderLineParser
+
+ORDERS_DB = "orders.db"
+ORDERS_CSV = "orders.csv"
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"     # how placed_at is stored (sorts correctly as text)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id       INTEGER PRIMARY KEY,
+    placed_at      TEXT NOT NULL,
+    subtotal_cents INTEGER NOT NULL,
+    delivery_cents INTEGER NOT NULL,
+    total_cents    INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS order_lines (
+    order_id   INTEGER NOT NULL REFERENCES orders(order_id),
+    item_id    INTEGER,
+    item_name  TEXT NOT NULL,
+    qty        INTEGER NOT NULL,
+    line_cents INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_placed_at ON orders(placed_at);
+CREATE INDEX IF NOT EXISTS order_lines_order ON order_lines(order_id);
+CREATE INDEX IF NOT EXISTS order_lines_item ON order_lines(item_name);
+CREATE INDEX IF NOT EXISTS order_lines_item_id ON order_lines(item_id);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+
+class OrderStore:
+    #Order repository backed by one SQLite file in WAL mode, so readers (reports)
+    #don't block the writer. Connections are pooled and may be used from any
+    #thread, one thread at a time.
+    def __init__(self, db_path=ORDERS_DB, pool_size=4):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self._pool = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # FULL: a commit is on disk when it returns. OrderWriter batches orders
+        # into one transaction, so this costs one fsync per batch.
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Borrow a pooled connection; commits on success, rolls back on error."""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.pool_size
+                if create:
+                    self._created += 1
+            # otherwise wait for another thread to return one
+            conn = self._connect() if create else self._pool.get()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        self._created = 0
+
+    # ---------------- writing ----------------
+    def _insert(self, conn, order):
+        placed_at, lines, subtotal_cents, delivery_cents, total_cents = order
+        if isinstance(placed_at, datetime):
+            placed_at = placed_at.strftime(TIME_FORMAT)
+        cursor = conn.execute(
+            "INSERT INTO orders (placed_at, subtotal_cents, delivery_cents, total_cents)"
+            " VALUES (?, ?, ?, ?)",
+            (placed_at, subtotal_cents, delivery_cents, total_cents),
+        )
+        order_id = cursor.lastrowid
+        conn.executemany(
+            "INSERT INTO order_lines (order_id, item_id, item_name, qty, line_cents)"
+            " VALUES (?, ?, ?, ?, ?)",
+            [(order_id, item_id, name, qty, cost) for item_id, name, qty, cost in lines],
+        )
+        return order_id
+
+    def add_order(self, placed_at, lines, subtotal_cents, delivery_cents, total_cents):
+        """Save one order. lines is a list of (item_id, name, qty, line_cents).
+
+        Returns the new order_id.
+        """
+        with self.connection() as conn:
+            return self._insert(conn, (placed_at, lines, subtotal_cents, delivery_cents, total_cents))
+
+    def add_orders(self, orders):
+        """Save several orders in one transaction. Each order is a tuple of add_order's arguments."""
+        with self.connection() as conn:
+            return [self._insert(conn, order) for order in orders]
+
+    # ---------------- reading ----------------
+    def count(self):
+        with self.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+    def orders_between(self, start, end):
+        """Orders placed in [start, end) as (order_id, placed_at, subtotal, delivery, total) rows."""
+        if isinstance(start, datetime):
+            start = start.strftime(TIME_FORMAT)
+        if isinstance(end, datetime):
+            end = end.strftime(TIME_FORMAT)
+        with self.connection() as conn:
+            return conn.execute(
+                "SELECT order_id, placed_at, subtotal_cents, delivery_cents, total_cents"
+                " FROM orders WHERE placed_at >= ? AND placed_at < ? ORDER BY placed_at",
+                (start, end),
+            ).fetchall()
+
+    def order_lines(self, order_id):
+        """Lines of one order as (item_id, item_name, qty, line_cents) rows."""
+        with self.connection() as conn:
+            return conn.execute(
+                "SELECT item_id, item_name, qty, line_cents FROM order_lines WHERE order_id = ?",
+                (order_id,),
+            ).fetchall()
+
+    def iter_orders(self):
+        """Stream every order as (placed_at, lines, subtotal, delivery, total), oldest first.
+
+        Rows are read from the cursor as they are needed, so memory use doesn't
+        depend on how many orders are stored. lines is a list of
+        (item_id, item_name, qty, line_cents).
+        """
+        parse_time = TimestampParser()
+        with self.connection() as conn:
+            cursor = conn.execute(
+                "SELECT o.order_id, o.placed_at, o.subtotal_cents, o.delivery_cents, o.total_cents,"
+                " l.item_id, l.item_name, l.qty, l.line_cents"
+                " FROM orders o LEFT JOIN order_lines l ON l.order_id = o.order_id"
+                " ORDER BY o.order_id"
+            )
+            for order_id, rows in itertools.groupby(cursor, key=lambda row: row[0]):
+                first = next(rows)
+                lines = [first[5:]] if first[6] is not None else []
+                lines.extend(row[5:] for row in rows)
+                yield (
+                    parse_time(first[1]), lines,
+                    first[2], first[3], first[4],
+                )
+
+    def item_sales(self, item_name):
+        """Total (qty, line_cents) sold of one item across all orders."""
+        with self.connection() as conn:
+            qty, cents = conn.execute(
+                "SELECT COALESCE(SUM(qty), 0), COALESCE(SUM(line_cents), 0)"
+                " FROM order_lines WHERE item_name = ?",
+                (item_name,),
+            ).fetchone()
+            return qty, cents
+
+    # ---------------- importing ----------------
+    def import_csv(self, path=ORDERS_CSV, catalog=None):
+        """One-time import of an orders.csv file (Date, Items Ordered, Subtotal, Delivery, Total).
+
+        catalog maps item name -> MenuItem and is used to fill in item_id and
+        line prices. Returns (imported, skipped), or None if this file has
+        already been imported or doesn't exist.
+        """
+        key = "imported:" + os.path.abspath(path)
+        with self.connection() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+                return None
+        try:
+            csv_file = open(path, "r", newline="", encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+        catalog = catalog or {}
+        parse_time = TimestampParser()
+        parse_lines = OrderLineParser(catalog)
+        imported = skipped = 0
+        with csv_file, self.connection() as conn:
+            for row in csv.DictReader(csv_file):
+                try:
+                    order = parse_csv_row(row, catalog, parse_time, parse_lines)
+                except (ValueError, ArithmeticError, KeyError):
+                    skipped += 1
+                    continue
+                self._insert(conn, order)
+                imported += 1
+            conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, str(imported)))
+        return imported, skipped
+
+
+def parse_csv_row(row, catalog, parse_time=None, parse_lines=None):
+    """Turn one orders.csv row into an add_order() tuple. Raises ValueError if malformed.
+
+    parse_time is a TimestampParser and parse_lines an OrderLineParser; pass the
+    same ones for every row of a file so they can reuse what they've cached.
+    """
+    if parse_time is None:
+        parse_time = TimestampParser()
+    if parse_lines is None:
+        parse_lines = OrderLineParser(catalog)
+    placed_at = parse_time(row["Date"])
+    errors = []
+    lines = parse_lines.parse(row["Items Ordered"], errors)
+    if errors:
+        raise ValueError(f"Bad order line: {errors[0][0]!r} ({errors[0][1]})")
+    return (
+        placed_at,
+        lines,
+        to_cents(row["Subtotal"]),
+        to_cents(row["Delivery"]),
+        to_cents(row["Total"]),
+    )
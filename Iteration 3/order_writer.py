@@ -0,0 +1,163 @@
+# Background order writer. submit_order hands finished orders to a queue and
+# returns straight away; a worker thread saves them in batches (one SQLite
+# transaction and one fsync of orders.csv per batch) and then reports back
+# through each order's callback.
+#
+# While it runs, <csv>.lock holds the writing process's id, so tools that
+# rewrite orders.csv (timestamps.py) can refuse to run under a live app.
+import atexit
+import csv
+import io
+import os
+import queue
+import threading
+
+from money import format_money
+from order_store import TIME_FORMAT
+from order_lines import format_lines
+
+ORDERS_CSV = "orders.csv"
+CSV_HEADER = ["Date", "Items Ordered", "Subtotal", "Delivery", "Total"]
+_STOP = object()
+
+
+def lock_path(csv_path):
+    return csv_path + ".lock"
+
+
+def _pid_alive(pid):
+    if os.name == "nt":
+        return True     # no safe check in the stdlib (os.kill would end the process)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True     # exists, owned by someone else
+    return True
+
+
+def writer_pid(csv_path):
+    """Process id of a running OrderWriter for csv_path, or None (stale locks are ignored)."""
+    try:
+        with open(lock_path(csv_path), "r", encoding="ascii") as lock:
+            pid = int(lock.read().strip())
+    except (FileNotFoundError, ValueError):
+        return None
+    return pid if _pid_alive(pid) else None
+
+
+def csv_row(order):
+    """The orders.csv row for an order tuple (placed_at, lines, subtotal, delivery, total)."""
+    placed_at, lines, subtotal, delivery_cost, total = order
+    return [
+        placed_at.strftime(TIME_FORMAT), format_lines(lines),
+        format_money(subtotal), format_money(delivery_cost), format_money(total),
+    ]
+
+
+class OrderWriter:
+    #Owns all order writes. Callbacks are called on the writer thread as
+    #callback(order_id, error) - error is None once the order is on disk.
+    #GUI code must hand the result back to Tk itself (see submit_order).
+    def __init__(self, order_store, csv_path=ORDERS_CSV, max_batch=100, log_index=None):
+        self.order_store = order_store
+        self.csv_path = csv_path
+        self.log_index = log_index      # optional OrderLogIndex kept up to date after each batch
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._closed = False
+        # Taken over if a crashed writer left one behind
+        with open(lock_path(csv_path), "w", encoding="ascii") as lock:
+            lock.write(str(os.getpid()))
+        self._thread = threading.Thread(target=self._run, name="order-writer", daemon=True)
+        self._thread.start()
+        # Daemon threads are killed at exit, so flush whatever is queued first
+        atexit.register(self.close)
+
+    def submit(self, order, callback=None):
+        """Queue an order tuple (placed_at, lines, subtotal, delivery, total) for saving."""
+        if self._closed:
+            raise RuntimeError("OrderWriter is closed")
+        self._queue.put((order, callback))
+
+    def pending(self):
+        """Approximate number of orders waiting to be written."""
+        return self._queue.qsize()
+
+    def close(self):
+        """Write everything still queued, then stop the worker thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        atexit.unregister(self.close)
+        if writer_pid(self.csv_path) == os.getpid():
+            os.remove(lock_path(self.csv_path))
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            # Group commit: take whatever else has queued up meanwhile
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stopping = True
+                batch = [entry for entry in batch if entry is not _STOP]
+                # Drain anything submitted before close() was called
+                while True:
+                    try:
+                        entry = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if entry is not _STOP:
+                        batch.append(entry)
+            if batch:
+                self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        orders = [order for order, callback in batch]
+        try:
+            order_ids = self.order_store.add_orders(orders)
+        except Exception as e:
+            self._report(batch, [None] * len(batch), f"Could not save order:\n{e}")
+            return
+
+        error = None
+        try:
+            self._append_csv(orders)
+        except Exception as e:
+            error = f"Order saved, but could not write it to {self.csv_path}:\n{e}"
+        else:
+            if self.log_index is not None:
+                try:
+                    self.log_index.refresh()    # only reads the rows just appended
+                except Exception:
+                    pass    # the index is rebuilt on next use if this fails
+        self._report(batch, order_ids, error)
+
+    def _append_csv(self, orders):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for order in orders:
+            writer.writerow(csv_row(order))
+        with open(self.csv_path, "a", newline="", encoding="utf-8") as file:
+            if file.tell() == 0:
+                csv.writer(file).writerow(CSV_HEADER)   # Write header if file is empty
+            file.write(buffer.getvalue())
+            file.flush()
+            os.fsync(file.fileno())     # one fsync for the whole batch
+
+    def _report(self, batch, order_ids, error):
+        for (order, callback), order_id in zip(batch, order_ids):
+            if callback is None:
+                continue
+            try:
+                callback(order_id, error)
+            except Exception:
+                pass    # a broken callback must not stop the writer
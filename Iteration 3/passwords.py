@@ -0,0 +1,101 @@
+# Salted scrypt password hashes. Each record carries its own cost settings,
+# so the work factor can be raised later without breaking existing accounts:
+#     scrypt$<n>$<r>$<p>$<salt hex>$<hash hex>
+import hashlib
+import hmac
+import os
+import threading
+from collections import OrderedDict
+
+# Cost settings that benchmarks/bench_passwords.py reports on. n is the
+# CPU/memory cost (memory used is about 128 * n * r bytes).
+COST_SETTINGS = {
+    "low": (2 ** 13, 8, 1),       # ~8 MB
+    "default": (2 ** 14, 8, 1),   # ~16 MB
+    "high": (2 ** 15, 8, 1),      # ~32 MB
+}
+DEFAULT_COST = COST_SETTINGS["default"]
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(
+        password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+        maxmem=256 * n * r + 1024 * 1024, dklen=HASH_BYTES,
+    )
+
+
+def hash_password(password, cost=DEFAULT_COST):
+    """Return a new salted hash record for password."""
+    n, r, p = cost
+    salt = os.urandom(SALT_BYTES)
+    digest = _scrypt(password, salt, n, r, p)
+    return f"scrypt${n}${r}${p}${salt.hex()}${digest.hex()}"
+
+
+def is_hashed(record):
+    """False for plaintext passwords left over from the old users.txt."""
+    return record.startswith("scrypt$")
+
+
+def needs_rehash(record, cost=DEFAULT_COST):
+    """True if the record is plaintext or uses a weaker cost than cost."""
+    if not is_hashed(record):
+        return True
+    _, n, r, p, _, _ = record.split("$")
+    # Field by field: a larger n doesn't make up for a smaller r
+    return any(have < want for have, want in zip((int(n), int(r), int(p)), cost))
+
+
+def verify_password(password, record):
+    """Check password against a stored record (constant-time compare)."""
+    if not is_hashed(record):
+        return hmac.compare_digest(password.encode("utf-8"), record.encode("utf-8"))
+    try:
+        _, n, r, p, salt, digest = record.split("$")
+        expected = bytes.fromhex(digest)
+        actual = _scrypt(password, bytes.fromhex(salt), int(n), int(r), int(p))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, expected)
+
+
+class PasswordVerifier:
+    #Wraps verify_password with a small cache of recent successful logins, so a
+    #customer logging in again on the same terminal doesn't pay the full scrypt
+    #cost. Only a keyed HMAC of the password is kept (the key never leaves this
+    #process), and entries are tied to the stored record so a password change
+    #invalidates them. Safe to call from worker threads.
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._key = os.urandom(32)
+        self._cache = OrderedDict()     # username -> (record, hmac of password)
+        self._lock = threading.Lock()
+
+    def _tag(self, username, password):
+        message = username.encode("utf-8") + b"\0" + password.encode("utf-8")
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def verify(self, username, password, record):
+        """Return True if password matches the stored record for username."""
+        tag = self._tag(username, password)
+        with self._lock:
+            cached = self._cache.get(username)
+            if cached is not None and cached[0] == record and hmac.compare_digest(cached[1], tag):
+                self._cache.move_to_end(username)
+                return True
+
+        if not verify_password(password, record):
+            return False
+
+        with self._lock:
+            self._cache[username] = (record, tag)
+            self._cache.move_to_end(username)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return True
+
+    def forget(self, username):
+        with self._lock:
+            self._cache.pop(username, None)
@@ -0,0 +1,149 @@
+# Sales reports over the order history, streamed one order at a time so memory
+# stays flat however many years of orders there are. Run next to iteration_3.py:
+#     python sales_report.py                      (reads orders.csv)
+#     python sales_report.py --source db          (reads orders.db)
+#     python sales_report.py --report item hour   (only some reports)
+import argparse
+import csv
+from collections import Counter
+
+from money import format_money
+from order_store import OrderStore, parse_csv_row, ORDERS_CSV, ORDERS_DB
+from timestamps import TimestampParser
+from order_lines import OrderLineParser
+
+REPORTS = ("day", "item", "hour", "delivery", "basket")
+
+
+# ---------------- pipeline stages ----------------
+def read_csv_rows(path):
+    """Yield orders.csv rows as dicts, one at a time."""
+    with open(path, "r", newline="", encoding="utf-8") as csv_file:
+        yield from csv.DictReader(csv_file)
+
+
+def parse_orders(rows, catalog, errors=None):
+    """Yield (placed_at, lines, subtotal, delivery, total) tuples, skipping bad rows.
+
+    Skipped rows are counted in errors["skipped"] when errors is given.
+    """
+    parse_time = TimestampParser()     # remembers the format of the previous row
+    parse_lines = OrderLineParser(catalog)
+    for row in rows:
+        try:
+            yield parse_csv_row(row, catalog, parse_time, parse_lines)
+        except (ValueError, ArithmeticError, KeyError, AttributeError):
+            if errors is not None:
+                errors["skipped"] = errors.get("skipped", 0) + 1
+
+
+def csv_orders(path, catalog, errors=None):
+    return parse_orders(read_csv_rows(path), catalog, errors)
+
+
+def db_orders(db_path):
+    return OrderStore(db_path).iter_orders()
+
+
+# ---------------- aggregation ----------------
+class SalesSummary:
+    #Running totals, updated one order at a time by add(). Its size depends on
+    #the number of days/items seen, never on the number of orders.
+    def __init__(self):
+        self.orders = 0
+        self.revenue_by_day = Counter()         # "YYYY-MM-DD" -> cents
+        self.revenue_by_hour = Counter()        # 0-23 -> cents
+        self.orders_by_hour = Counter()
+        self.item_qty = Counter()               # item name -> qty sold
+        self.item_revenue = Counter()           # item name -> cents (from line prices)
+        self.delivery_orders = 0
+        self.delivery_revenue = 0
+        self.takeaway_orders = 0
+        self.takeaway_revenue = 0
+        self.total_items = 0
+        self.total_revenue = 0
+
+    def add(self, order):
+        placed_at, lines, subtotal, delivery_cost, total = order
+        self.orders += 1
+        self.total_revenue += total
+        self.revenue_by_day[placed_at.strftime("%Y-%m-%d")] += total
+        self.revenue_by_hour[placed_at.hour] += total
+        self.orders_by_hour[placed_at.hour] += 1
+
+        for item_id, name, qty, line_cents in lines:
+            self.item_qty[name] += qty
+            self.item_revenue[name] += line_cents
+            self.total_items += qty
+
+        if delivery_cost > 0:
+            self.delivery_orders += 1
+            self.delivery_revenue += total
+        else:
+            self.takeaway_orders += 1
+            self.takeaway_revenue += total
+
+    def average_basket_items(self):
+        return self.total_items / self.orders if self.orders else 0.0
+
+    def average_basket_cents(self):
+        return round(self.total_revenue / self.orders) if self.orders else 0
+
+
+def summarise(orders):
+    """Consume an order stream and return its SalesSummary."""
+    summary = SalesSummary()
+    for order in orders:
+        summary.add(order)
+    return summary
+
+
+# ---------------- output ----------------
+def print_report(summary, reports=REPORTS):
+    if "day" in reports:
+        print("Revenue per day")
+        for day in sorted(summary.revenue_by_day):
+            print(f"  {day}  ${format_money(summary.revenue_by_day[day]):>10}")
+    if "item" in reports:
+        print("Sales per item")
+        for name, qty in summary.item_qty.most_common():
+            print(f"  {name:<20} {qty:>6} sold  ${format_money(summary.item_revenue[name]):>10}")
+    if "hour" in reports:
+        print("Revenue per hour of day")
+        for hour in sorted(summary.revenue_by_hour):
+            print(f"  {hour:02d}:00  {summary.orders_by_hour[hour]:>5} orders"
+                  f"  ${format_money(summary.revenue_by_hour[hour]):>10}")
+    if "delivery" in reports:
+        print("Delivery vs takeaway")
+        print(f"  Delivery  {summary.delivery_orders:>6} orders  ${format_money(summary.delivery_revenue):>10}")
+        print(f"  Takeaway  {summary.takeaway_orders:>6} orders  ${format_money(summary.takeaway_revenue):>10}")
+    if "basket" in reports:
+        print("Average basket")
+        print(f"  {summary.average_basket_items():.2f} items, ${format_money(summary.average_basket_cents())}"
+              f" over {summary.orders} orders")
+
+
+def main():
+    from takeaway_engine import TakeawayApp
+
+    parser = argparse.ArgumentParser(description="Sales reports over the order history.")
+    parser.add_argument("--source", choices=("csv", "db"), default="csv")
+    parser.add_argument("--csv", default=ORDERS_CSV, help="orders.csv to read")
+    parser.add_argument("--db", default=ORDERS_DB, help="orders.db to read")
+    parser.add_argument("--report", nargs="+", choices=REPORTS, default=REPORTS)
+    args = parser.parse_args()
+
+    errors = {}
+    if args.source == "csv":
+        # orders.csv has no line prices, so item revenue uses current menu prices
+        orders = csv_orders(args.csv, TakeawayApp().items_by_name, errors)
+    else:
+        orders = db_orders(args.db)
+
+    print_report(summarise(orders), args.report)
+    if errors.get("skipped"):
+        print(f"\n{errors['skipped']} malformed rows skipped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+# Per-customer baskets for many logged-in users in one process.
+#   - CompactBasket is a small __slots__ object whose quantities live in a
+#     byte array indexed by the item's slot in a shared BasketCatalog, rather
+#     than a TakeawayApp with its own dicts per customer
+#   - SessionManager hands out baskets and evicts them when they have been
+#     idle longer than the TTL, or least recently used first when the
+#     estimated memory goes over its cap
+#   - open_user_session gives a logged-in user their session, with the basket
+#     backed by their own crash journal under BASKETS_DIR (the first one
+#     also takes over the single basket.journal older versions kept)
+import hashlib
+import os
+import secrets
+import sys
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+
+from basket_journal import JOURNAL_PATH, BasketJournal
+from money import format_money
+from takeaway_engine import DELIVERY_FEE_CENTS, MAX_ITEM_QTY
+
+DEFAULT_TTL = 30 * 60                   # seconds a basket may sit idle
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024    # estimated memory for all baskets together
+BASKETS_DIR = "baskets"                 # one crash journal per user
+
+
+class BasketCatalog:
+    #Maps item_id <-> a dense slot number shared by every basket. Slots are
+    #never reused, so a basket's array stays valid when the menu changes; new
+    #items get the next slot the first time they are ordered.
+    def __init__(self, app):
+        self.app = app                  # TakeawayApp that owns the menu
+        self.items = []                 # slot -> MenuItem
+        self.slot_of = {}               # item_id -> slot
+        for item in app.items_by_id.values():
+            self._add(item)
+
+    def _add(self, item):
+        self.slot_of[item.item_id] = len(self.items)
+        self.items.append(item)
+
+    def slot_for(self, item_id):
+        """Return the slot for item_id, or None if it isn't on the menu."""
+        slot = self.slot_of.get(item_id)
+        if slot is None:
+            item = self.app.items_by_id.get(item_id)
+            if item is None:
+                return None
+            slot = len(self.items)
+            self._add(item)
+        return slot
+
+    def __len__(self):
+        return len(self.items)
+
+
+class CompactBasket:
+    #The basket half of TakeawayApp (add_to_order, update_item_quantity,
+    #order, build_order, ...) in a few hundred bytes.
+    __slots__ = ("catalog", "quantities", "line_slots", "subtotal", "journal")
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.quantities = array("B", bytes(len(catalog)))   # slot -> qty (0-10 fits a byte)
+        self.line_slots = []        # slots with qty > 0, in the order they were added
+        self.subtotal = 0           # cents
+        self.journal = None         # optional BasketJournal, as for TakeawayApp
+
+    def _set(self, slot, qty):
+        if slot >= len(self.quantities):
+            self.quantities.extend(bytes(slot + 1 - len(self.quantities)))   # menu grew
+        item = self.catalog.items[slot]
+        old = self.quantities[slot]
+        self.subtotal += (qty - old) * item.price_cents
+        self.quantities[slot] = qty
+        if old == 0 and qty > 0:
+            self.line_slots.append(slot)
+        elif old > 0 and qty == 0:
+            self.line_slots.remove(slot)
+        if self.journal is not None:
+            self.journal.record_set(item.item_id, qty)
+            if self.journal.needs_compaction():
+                self.journal.compact(self.item_quantities)
+
+    def _qty(self, slot):
+        return self.quantities[slot] if slot < len(self.quantities) else 0
+
+    # ---------------- TakeawayApp-compatible basket API ----------------
+    def add_to_order(self, item_id, quantity):
+        """Add an item, enforcing MAX_ITEM_QTY per item. Returns False if refused."""
+        slot = self.catalog.slot_for(item_id)
+        if slot is None:
+            return False
+        total_qty = self._qty(slot) + quantity
+        if total_qty > MAX_ITEM_QTY or total_qty < 0:
+            return False
+        self._set(slot, total_qty)
+        return True
+
+    def update_item_quantity(self, item_name, new_qty):
+        """Set the quantity of an item already in the basket (0 removes it)."""
+        item = self.catalog.app.items_by_name.get(item_name)
+        if item is None:
+            return
+        slot = self.catalog.slot_for(item.item_id)
+        if self._qty(slot) == 0:
+            return
+        self._set(slot, max(0, min(new_qty, MAX_ITEM_QTY)))
+
+    def get_item_quantity(self, item_id):
+        slot = self.catalog.slot_of.get(item_id)
+        return self._qty(slot) if slot is not None else 0
+
+    def order_lines(self):
+        """Yield (item_id, name, qty, cost_cents) for each line, in the order added."""
+        for slot in self.line_slots:
+            item = self.catalog.items[slot]
+            qty = self.quantities[slot]
+            yield item.item_id, item.name, qty, qty * item.price_cents
+
+    @property
+    def order(self):
+        """(item_name, qty, cost_cents) tuples, like TakeawayApp.order."""
+        return [(name, qty, cost) for item_id, name, qty, cost in self.order_lines()]
+
+    @property
+    def item_quantities(self):
+        return {item_id: qty for item_id, name, qty, cost in self.order_lines()}
+
+    @property
+    def subtotal_cents(self):
+        return self.subtotal
+
+    @property
+    def total_cost(self):
+        return self.subtotal / 100
+
+    def get_order_summary(self):
+        """Return formatted order summary with all items + total cost."""
+        if not self.line_slots:
+            return "No items ordered yet."
+        summary = ""
+        for item_id, name, qty, cost in self.order_lines():
+            summary += f"{qty} x {name} - ${format_money(cost)}\n"
+        summary += f"\nTotal cost: ${format_money(self.subtotal)}"
+        return summary
+
+    def build_order(self, delivery=False, placed_at=None):
+        """Same order tuple as TakeawayApp.build_order, for OrderWriter."""
+        delivery_cost = DELIVERY_FEE_CENTS if delivery else 0
+        return (placed_at or datetime.now(), list(self.order_lines()),
+                self.subtotal, delivery_cost, self.subtotal + delivery_cost)
+
+    def clear_order(self):
+        for slot in self.line_slots:
+            self.quantities[slot] = 0
+        self.line_slots.clear()
+        self.subtotal = 0
+        if self.journal is not None:
+            self.journal.compact({})
+
+    def attach_journal(self, journal):
+        """Restore the basket saved in journal, then record every change to it."""
+        self.journal = None
+        for item_id, qty in journal.replay().items():
+            slot = self.catalog.slot_for(item_id)
+            if slot is not None:
+                self._set(slot, min(qty, MAX_ITEM_QTY))
+        self.journal = journal
+        journal.compact(self.item_quantities)
+
+    def nbytes(self):
+        """Rough memory used by this basket."""
+        return (sys.getsizeof(self) + sys.getsizeof(self.quantities)
+                + sys.getsizeof(self.line_slots))
+
+
+class Session:
+    __slots__ = ("session_id", "username", "basket", "last_seen", "submitting", "holds")
+
+    def __init__(self, session_id, username, basket):
+        self.session_id = session_id
+        self.username = username
+        self.basket = basket
+        self.last_seen = time.monotonic()
+        self.submitting = False
+        self.holds = 0                  # open windows using it; never evicted while > 0
+
+
+SESSION_OVERHEAD = 200      # rough bytes for the Session object and dict entry
+
+
+def shard_of(session_id, shards):
+    """Which of `shards` worker processes owns session_id (see order_cluster.py)."""
+    return zlib.crc32(session_id.encode("ascii")) % shards
+
+
+class SessionManager:
+    def __init__(self, app, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, clock=time.monotonic,
+                 shard=None):
+        self.catalog = BasketCatalog(app)
+        self.shard = shard                  # (index, count): only hand out ids that shard_of maps here
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._sessions = OrderedDict()      # session_id -> Session, least recently used first
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def create(self, username, session_id=None):
+        """Start a session with an empty basket. Returns the Session."""
+        self.evict_idle()
+        session_id = session_id or self._new_session_id()
+        session = Session(session_id, username, CompactBasket(self.catalog))
+        session.last_seen = self.clock()
+        self._sessions[session_id] = session
+        self._enforce_memory_cap()
+        return session
+
+    def _new_session_id(self):
+        while True:
+            session_id = secrets.token_urlsafe(16)
+            # With N shards about one id in N fits, so this loops N times on average
+            if self.shard is None or shard_of(session_id, self.shard[1]) == self.shard[0]:
+                return session_id
+
+    def get(self, session_id):
+        """Return the live Session (and mark it used), or None if unknown or expired."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        now = self.clock()
+        if now - session.last_seen > self.ttl and not session.holds:
+            self._drop(session_id)
+            return None
+        session.last_seen = now
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def find_user(self, username):
+        """Most recently used live session for username, or None."""
+        for session in reversed(self._sessions.values()):
+            if session.username == username:
+                return self.get(session.session_id)
+        return None
+
+    def hold(self, session):
+        """Keep session alive, however long it sits idle, until release() is called."""
+        session.holds += 1
+
+    def release(self, session):
+        """Undo one hold(); the TTL counts from now."""
+        session.holds -= 1
+        session.last_seen = self.clock()
+
+    def close(self, session_id):
+        """End a session. Returns False if it didn't exist."""
+        return self._drop(session_id, count=False)
+
+    def close_all(self):
+        """End every session, closing their journals (on shutdown)."""
+        for session_id in list(self._sessions):
+            self._drop(session_id, count=False)
+
+    def _drop(self, session_id, count=True):
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        if session.basket.journal is not None:
+            session.basket.journal.close()
+        if count:
+            self.evicted += 1
+        return True
+
+    def evict_idle(self):
+        """Drop sessions idle longer than the TTL. Returns how many were dropped."""
+        cutoff = self.clock() - self.ttl
+        stale = []
+        # Least recently used first, so stop at the first one still fresh
+        for session_id, session in self._sessions.items():
+            if session.last_seen >= cutoff:
+                break
+            if not (session.submitting or session.holds):   # order being saved / window open
+                stale.append(session_id)
+        for session_id in stale:
+            self._drop(session_id)
+        return len(stale)
+
+    def memory_estimate(self):
+        return sum(s.basket.nbytes() + SESSION_OVERHEAD for s in self._sessions.values())
+
+    def _enforce_memory_cap(self):
+        # Cheap upper bound first; only walk the sessions when it might be over
+        if len(self._sessions) * (SESSION_OVERHEAD + 256 + len(self.catalog)) <= self.max_bytes:
+            return
+        total = self.memory_estimate()
+        for session_id, session in list(self._sessions.items())[:-1]:   # never the newest
+            if total <= self.max_bytes:
+                break
+            if not (session.submitting or session.holds):
+                total -= session.basket.nbytes() + SESSION_OVERHEAD
+                self._drop(session_id)
+
+
+def adopt_legacy_journal(basket, path=JOURNAL_PATH):
+    """Merge the basket saved in an old shared journal into basket, then delete it."""
+    if not os.path.exists(path):
+        return
+    legacy = BasketJournal(path)
+    for item_id, qty in legacy.replay().items():
+        room = MAX_ITEM_QTY - basket.get_item_quantity(item_id)
+        if room > 0:
+            basket.add_to_order(item_id, min(qty, room))
+    os.remove(path)
+    if os.path.exists(path + ".tmp"):       # left by a compaction cut short
+        os.remove(path + ".tmp")
+
+
+def open_user_session(sessions, username, baskets_dir=BASKETS_DIR, legacy_journal=JOURNAL_PATH):
+    """Return username's session, starting one (and restoring their saved basket) if needed."""
+    session = sessions.find_user(username)
+    if session is None:
+        session = sessions.create(username)
+        os.makedirs(baskets_dir, exist_ok=True)
+        name = hashlib.sha1(username.encode("utf-8")).hexdigest()[:16]   # safe as a file name
+        session.basket.attach_journal(BasketJournal(os.path.join(baskets_dir, f"{name}.journal")))
+        adopt_legacy_journal(session.basket, legacy_journal)
+    return session
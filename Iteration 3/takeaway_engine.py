@@ -0,0 +1,256 @@
+# Order engine: menu, basket and totals, with no GUI code, so the Tk app, the
+# HTTP service (order_service.py) and the command-line tools can all share it.
+from datetime import datetime
+
+from money import to_cents, format_money
+
+DELIVERY_FEE_CENTS = 500    # $5.00 delivery charge
+MAX_ITEM_QTY = 10           # most of any one item per order
+
+# -------------------- CLASSES --------------------
+class MenuItem:
+    #Represents a single menu item with ID, name, price, and optional image.
+    def __init__(self, item_id, name, price, image_path=None):
+        self.item_id = item_id
+        self.name = name
+        self.price = price
+        self.price_cents = to_cents(price)   # exact price used for all order maths
+        self.image_path = image_path
+
+#Order lines keyed by item_id, with the subtotal kept up to date as lines change.
+class OrderLedger:
+    def __init__(self):
+        # item_id -> (item_name, qty, cost_cents); dicts keep insertion order
+        self._lines = {}
+        self.subtotal = 0      # in cents
+
+    def set_line(self, item_id, name, qty, cost):
+        """Set (or remove, when qty is 0) the line for item_id in constant time."""
+        old = self._lines.get(item_id)
+        if old is not None:
+            self.subtotal -= old[2]
+        if qty > 0:
+            self._lines[item_id] = (name, qty, cost)
+            self.subtotal += cost
+        elif old is not None:
+            del self._lines[item_id]
+
+    def get_line(self, item_id):
+        """Return the (name, qty, cost_cents) line for item_id, or None."""
+        return self._lines.get(item_id)
+
+    def clear(self):
+        """Remove every line and reset the subtotal."""
+        self._lines.clear()
+        self.subtotal = 0
+
+    def lines(self):
+        """Read-only live view of the (name, qty, cost_cents) lines."""
+        return self._lines.values()
+
+    def items(self):
+        """Read-only live view of (item_id, (name, qty, cost_cents)) pairs."""
+        return self._lines.items()
+
+    def __len__(self):
+        return len(self._lines)
+
+#Main application logic for managing menu, orders, and item quantities.
+class TakeawayApp:
+    def __init__(self, catalog=None):
+        # catalog: another TakeawayApp whose menu and lookup tables this one
+        # shares (one menu in memory for many baskets, e.g. in order_service.py)
+        if catalog is not None:
+            self.menu = catalog.menu
+            self.items_by_id = catalog.items_by_id
+            self.items_by_name = catalog.items_by_name
+            self.menu_versions = catalog.menu_versions
+            self._new_basket()
+            return
+
+        self.menu = {
+            "Mains": [
+                MenuItem(1, "Burger", 8.50, "images/burger.jpeg"),
+                MenuItem(2, "Pizza", 12.00, "images/pizza.png"),
+                MenuItem(3, "Pasta", 11.00, "images/pasta.png")
+            ],
+            "Sides": [
+                MenuItem(4, "Fries", 4.00, "images/fries.png"),
+                MenuItem(5, "Salad", 5.00, "images/salad.png"),
+                MenuItem(6, "Garlic naan", 3.50, "images/garlic_naan.png")
+            ],
+            "Drinks": [
+                MenuItem(7, "Cola", 2.50, "images/cola.png"),
+                MenuItem(8, "O_Juice", 3.00, "images/o_juice.png"),
+                MenuItem(9, "Lemonade", 3.50, "images/lemonade.png")
+            ]
+        }
+
+        self._new_basket()
+
+        # Lookup tables so items can be found without walking the whole menu
+        self.items_by_id = {}
+        self.items_by_name = {}
+        # category -> change counter, so the GUI knows when to rebuild a category's panel
+        self.menu_versions = {}
+        self.rebuild_index()
+
+    def _new_basket(self):
+        # Order lines live in a ledger keyed by item_id (see OrderLedger)
+        self.ledger = OrderLedger()
+
+        # Tracks how many of each item (by item_id) have been ordered
+        self.item_quantities = {}
+
+        # Optional BasketJournal so the basket survives a crash (see attach_journal)
+        self.journal = None
+
+    def rebuild_index(self):
+        """Rebuild the id and name lookup tables from self.menu."""
+        # Cleared in place, as other baskets may share these dicts
+        self.items_by_id.clear()
+        self.items_by_name.clear()
+        for items in self.menu.values():
+            for item in items:
+                self.items_by_id[item.item_id] = item
+                self.items_by_name[item.name] = item
+        for category in self.menu:
+            self.mark_category_changed(category)
+
+    def mark_category_changed(self, category):
+        """Record that a category's items changed (call after editing a MenuItem in place)."""
+        self.menu_versions[category] = self.menu_versions.get(category, 0) + 1
+
+    def category_version(self, category):
+        """Return the change counter for a category."""
+        return self.menu_versions.get(category, 0)
+
+    def add_menu_item(self, category, item):
+        """Add a MenuItem to a category (created if needed) and index it."""
+        self.menu.setdefault(category, []).append(item)
+        self.items_by_id[item.item_id] = item
+        self.items_by_name[item.name] = item
+        self.mark_category_changed(category)
+
+    def remove_menu_item(self, item_id):
+        """Remove a MenuItem from the menu and the lookup tables."""
+        item = self.items_by_id.pop(item_id, None)
+        if item is None:
+            return False
+        self.items_by_name.pop(item.name, None)
+        for category, items in self.menu.items():
+            if item in items:
+                items.remove(item)
+                self.mark_category_changed(category)
+                break
+        return True
+
+    def get_item(self, item_id):
+        """Return the MenuItem with this id, or None."""
+        return self.items_by_id.get(item_id)
+
+    def find_item_by_name(self, name):
+        """Return the MenuItem with this name, or None."""
+        return self.items_by_name.get(name)
+
+    def add_to_order(self, item_id, quantity):
+        """Add an item to the order, enforcing max qty of MAX_ITEM_QTY per item."""
+        item = self.items_by_id.get(item_id)
+        if item is None:
+            return False
+
+        current_qty = self.item_quantities.get(item_id, 0)
+        total_qty = current_qty + quantity
+
+        # Restrict max quantity of each item to 10
+        if total_qty > MAX_ITEM_QTY:
+            return False
+
+        self._set_quantity(item, total_qty)
+        return True
+#Update quantity of an existing item. Remove if new_qty=0.
+    def update_item_quantity(self, item_name, new_qty):
+        item = self.items_by_name.get(item_name)
+        if item is None:
+            return
+        line = self.ledger.get_line(item.item_id)
+        if line is None:
+            return
+
+        # Update quantity + cost; if qty = 0, remove item completely
+        self._set_quantity(item, max(new_qty, 0))
+
+    def _set_quantity(self, item, qty):
+        # Single place the basket changes: ledger line, running subtotal,
+        # item_quantities and the crash journal all stay in step.
+        self.ledger.set_line(item.item_id, item.name, qty, qty * item.price_cents)
+        if qty > 0:
+            self.item_quantities[item.item_id] = qty
+        else:
+            self.item_quantities.pop(item.item_id, None)
+
+        if self.journal is not None:
+            self.journal.record_set(item.item_id, qty)
+            if self.journal.needs_compaction():
+                self.journal.compact(self.item_quantities)
+
+    def clear_order(self):
+        """Empty the basket (e.g. once an order has been submitted)."""
+        self.ledger.clear()
+        self.item_quantities.clear()
+        if self.journal is not None:
+            self.journal.compact({})
+
+    def attach_journal(self, journal):
+        """Restore the basket saved in journal, then record every change to it."""
+        self.journal = None     # don't re-journal the replay itself
+        for item_id, qty in journal.replay().items():
+            item = self.items_by_id.get(item_id)
+            if item is not None:    # items taken off the menu are dropped
+                self._set_quantity(item, min(qty, MAX_ITEM_QTY))
+        self.journal = journal
+        journal.compact(self.item_quantities)
+
+    @property
+    def order(self):
+        """Read-only view of the order as (item_name, qty, cost_cents) tuples."""
+        return self.ledger.lines()
+
+    @property
+    def subtotal_cents(self):
+        """Exact order subtotal in cents."""
+        return self.ledger.subtotal
+
+    @property
+    def total_cost(self):
+        """Order subtotal in dollars (float), kept for display code."""
+        return self.ledger.subtotal / 100
+
+    def get_item_quantity(self, item_id):
+        """Return the quantity of an item currently in the order."""
+        return self.item_quantities.get(item_id, 0)
+
+    def get_order_summary(self):
+        """Return formatted order summary with all items + total cost."""
+        if not self.order:
+            return "No items ordered yet."
+        summary = ""
+        for name, qty, cost in self.order:
+            summary += f"{qty} x {name} - ${format_money(cost)}\n"
+        summary += f"\nTotal cost: ${format_money(self.subtotal_cents)}"
+        return summary
+
+    def order_lines(self):
+        """Yield (item_id, name, qty, line_cents) for each line, in the order added."""
+        for item_id, (name, qty, cost) in self.ledger.items():
+            yield item_id, name, qty, cost
+
+    def build_order(self, delivery=False, placed_at=None):
+        """Return the basket as an order tuple for OrderWriter/OrderStore:
+        (placed_at, lines, subtotal_cents, delivery_cents, total_cents), where
+        lines are (item_id, name, qty, line_cents).
+        """
+        subtotal = self.subtotal_cents
+        delivery_cost = DELIVERY_FEE_CENTS if delivery else 0
+        lines = list(self.order_lines())
+        return (placed_at or datetime.now(), lines, subtotal, delivery_cost, subtotal + delivery_cost)
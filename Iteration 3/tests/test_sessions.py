@@ -0,0 +1,106 @@
+# Run from the "Iteration 3" folder:
+#     python -m unittest discover tests
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sessions import SessionManager, open_user_session
+from takeaway_engine import TakeawayApp
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class EvictReloginTest(unittest.TestCase):
+    # A user's order window is open, they go idle past the TTL, someone else
+    # logs in (which evicts idle sessions), they log in again, then the app
+    # crashes: their basket must come back from the journal.
+
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.baskets_dir = os.path.join(self.workdir.name, "baskets")
+        self.legacy_journal = os.path.join(self.workdir.name, "basket.journal")
+        self.app = TakeawayApp()
+        self.item_id = next(iter(self.app.items_by_id))
+        self.clock = FakeClock()
+        self.sessions = SessionManager(self.app, ttl=60, clock=self.clock)
+
+    def tearDown(self):
+        self.sessions.close_all()
+        self.workdir.cleanup()
+
+    def open(self, sessions, username):
+        return open_user_session(sessions, username, self.baskets_dir, self.legacy_journal)
+
+    def crash_and_restore(self, username):
+        self.sessions.close_all()
+        restarted = SessionManager(self.app, ttl=60, clock=self.clock)
+        try:
+            return self.open(restarted, username).basket.get_item_quantity(self.item_id)
+        finally:
+            restarted.close_all()
+
+    def test_open_window_keeps_its_session(self):
+        session = self.open(self.sessions, "alice")
+        self.sessions.hold(session)
+        session.basket.add_to_order(self.item_id, 3)
+
+        self.clock.now += 3600
+        self.open(self.sessions, "bob")
+        again = self.open(self.sessions, "alice")
+
+        self.assertIs(again, session)
+        self.assertEqual(self.sessions.evicted, 0)
+        session.basket.add_to_order(self.item_id, 2)
+        self.assertEqual(self.crash_and_restore("alice"), 5)
+
+    def test_closed_window_is_evicted_and_restored(self):
+        session = self.open(self.sessions, "alice")
+        self.sessions.hold(session)
+        session.basket.add_to_order(self.item_id, 3)
+        self.sessions.release(session)
+
+        self.clock.now += 3600
+        self.open(self.sessions, "bob")
+        self.assertEqual(self.sessions.evicted, 1)
+
+        again = self.open(self.sessions, "alice")
+        self.assertIsNot(again, session)
+        self.assertEqual(again.basket.get_item_quantity(self.item_id), 3)
+        again.basket.add_to_order(self.item_id, 1)
+        self.assertEqual(self.crash_and_restore("alice"), 4)
+
+    def test_memory_cap_skips_open_windows(self):
+        sessions = SessionManager(self.app, ttl=60, max_bytes=0, clock=self.clock)
+        try:
+            held = sessions.create("alice")
+            sessions.hold(held)
+            sessions.create("bob")
+            sessions.create("carol")
+            self.assertIs(sessions.get(held.session_id), held)
+        finally:
+            sessions.close_all()
+
+
+    def test_legacy_journal_goes_to_first_login(self):
+        with open(self.legacy_journal, "w", encoding="utf-8") as journal:
+            journal.write(f"S {self.item_id} 4\n")
+        session = self.open(self.sessions, "alice")
+        self.assertEqual(session.basket.get_item_quantity(self.item_id), 4)
+        session.basket.add_to_order(self.item_id, 1)
+
+        self.assertFalse(os.path.exists(self.legacy_journal))
+        self.assertEqual(self.open(self.sessions, "bob").basket.get_item_quantity(self.item_id), 0)
+        self.assertEqual(self.crash_and_restore("alice"), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+# Offline thumbnail build: pre-renders every menu picture at the sizes the GUI
+# shows, so the order window can load small files instead of resizing the
+# full-size assets at runtime.
+#
+# Run from the "Iteration 3" folder after changing any picture:
+#     python thumbnails.py            (only rebuilds what changed)
+#     python thumbnails.py --force    (rebuilds everything)
+import argparse
+import hashlib
+import json
+import os
+
+THUMB_DIR = "thumbnails"
+MANIFEST_NAME = "manifest.json"
+
+
+def thumbnail_path(source, size, thumb_dir=THUMB_DIR):
+    """Where the thumbnail of source at size (w, h) is stored."""
+    stem = os.path.splitext(os.path.basename(source))[0]
+    digest = hashlib.sha1(os.path.normpath(source).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(thumb_dir, f"{stem}-{size[0]}x{size[1]}-{digest}.png")
+
+
+def fresh_thumbnail(source, size, thumb_dir=THUMB_DIR):
+    """Return the thumbnail path if it exists and is newer than source, else None."""
+    thumb = thumbnail_path(source, size, thumb_dir)
+    try:
+        if os.stat(thumb).st_mtime >= os.stat(source).st_mtime:
+            return thumb
+    except OSError:
+        pass
+    return None
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(thumb_dir=THUMB_DIR):
+    try:
+        with open(os.path.join(thumb_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest, thumb_dir=THUMB_DIR):
+    tmp_path = os.path.join(thumb_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, os.path.join(thumb_dir, MANIFEST_NAME))
+
+
+def build_thumbnails(sources, sizes, thumb_dir=THUMB_DIR, force=False):
+    """Render each source at each size. Returns (built, skipped, missing) counts."""
+    from PIL import Image
+
+    os.makedirs(thumb_dir, exist_ok=True)
+    manifest = load_manifest(thumb_dir)
+    built = skipped = missing = 0
+
+    for source in sorted(set(sources)):
+        try:
+            stat = os.stat(source)
+        except OSError:
+            missing += 1
+            continue
+
+        entry = manifest.get(source, {})
+        thumbs = [thumbnail_path(source, size, thumb_dir) for size in sizes]
+        all_exist = all(os.path.exists(t) for t in thumbs)
+        unchanged = entry.get("mtime") == stat.st_mtime and entry.get("size") == stat.st_size
+
+        if not force and all_exist and not unchanged:
+            # mtime changed (e.g. a fresh checkout): only re-render if the content did
+            if entry.get("sha256") == file_sha256(source):
+                unchanged = True
+                entry["mtime"] = stat.st_mtime
+                for thumb in thumbs:
+                    os.utime(thumb)   # keep fresh_thumbnail() happy
+
+        if not force and all_exist and unchanged:
+            skipped += 1
+            continue
+
+        with Image.open(source) as img:
+            for size, thumb in zip(sizes, thumbs):
+                img.resize(size, Image.Resampling.LANCZOS).save(thumb, "PNG")
+        manifest[source] = {
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "sha256": file_sha256(source),
+        }
+        built += 1
+
+    save_manifest(manifest, thumb_dir)
+    return built, skipped, missing
+
+
+def main():
+    from takeaway_engine import TakeawayApp
+    from image_cache import ITEM_IMAGE_SIZE, NO_IMAGE_PATH
+
+    parser = argparse.ArgumentParser(description="Pre-render menu thumbnails.")
+    parser.add_argument("--force", action="store_true", help="rebuild every thumbnail")
+    parser.add_argument("--dir", default=THUMB_DIR, help="thumbnail cache directory")
+    args = parser.parse_args()
+
+    app = TakeawayApp()
+    sources = [item.image_path for items in app.menu.values() for item in items if item.image_path]
+    sources.append(NO_IMAGE_PATH)
+
+    built, skipped, missing = build_thumbnails(sources, [ITEM_IMAGE_SIZE], args.dir, args.force)
+    print(f"Built {built}, up to date {skipped}, missing source files {missing}.")
+
+
+if __name__ == "__main__":
+    main()
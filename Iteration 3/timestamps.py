@@ -0,0 +1,133 @@
+# Fast timestamp parsing for orders.csv, which mixes old hand-entered rows
+# ("11/10/2025 14:50", day first) with the ISO rows submit_order writes
+# ("2025-10-15 12:52:50"). Rows of the same format come in runs, so the parser
+# remembers which pattern matched last and tries it first; each pattern is a
+# precompiled regex whose groups go straight into datetime(), which is several
+# times faster than a chain of strptime() calls.
+#
+# As a tool it rewrites legacy rows to ISO-8601 in place:
+#     python timestamps.py orders.csv
+# Stop the app (and order_service / order_cluster) first: it refuses to run
+# while an OrderWriter holds orders.csv.lock.
+import argparse
+import csv
+import os
+import re
+import shutil
+import sys
+from datetime import datetime
+
+ISO_FORMAT = "%Y-%m-%d %H:%M:%S"      # what submit_order writes
+
+# (name, regex, order of year/month/day groups). Time groups are always H, M, optional S.
+PATTERNS = [
+    ("iso", re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})[ T](\d{1,2}):(\d{2})(?::(\d{2}))?(?:\.\d+)?$"), (0, 1, 2)),
+    ("day-first", re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4}) (\d{1,2}):(\d{2})(?::(\d{2}))?$"), (2, 1, 0)),
+]
+# Slow path for anything the patterns don't cover
+FALLBACK_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y %H:%M", "%Y/%m/%d %H:%M:%S")
+
+
+class TimestampParser:
+    #One parser per file: it caches the pattern that matched the previous row.
+    def __init__(self):
+        self.current = PATTERNS[0]
+        self.switches = 0       # how many times the detected format changed
+        self.fallbacks = 0      # rows that needed strptime
+
+    def _try(self, pattern, text):
+        match = pattern[1].match(text)
+        if match is None:
+            return None
+        groups = match.groups()
+        y, m, d = (groups[i] for i in pattern[2])
+        return datetime(int(y), int(m), int(d), int(groups[3]), int(groups[4]), int(groups[5] or 0))
+
+    def parse(self, text):
+        """Return a datetime for text. Raises ValueError if no known format fits."""
+        text = text.strip()
+        try:
+            value = self._try(self.current, text)
+            if value is not None:
+                return value
+            # Format changed: find the pattern for this new segment of the file
+            for pattern in PATTERNS:
+                if pattern is not self.current:
+                    value = self._try(pattern, text)
+                    if value is not None:
+                        self.current = pattern
+                        self.switches += 1
+                        return value
+        except ValueError:
+            pass    # matched the shape but not a real date (e.g. month 13)
+        for fmt in FALLBACK_FORMATS:
+            try:
+                value = datetime.strptime(text, fmt)
+            except ValueError:
+                continue
+            self.fallbacks += 1
+            return value
+        raise ValueError(f"Unrecognised timestamp: {text!r}")
+
+    __call__ = parse
+
+
+def to_iso(value):
+    return value.strftime(ISO_FORMAT)
+
+
+def migrate_csv(path, column="Date", backup=True):
+    """Rewrite every timestamp in path's column to ISO-8601. Returns (rewritten, unparsed).
+
+    Raises RuntimeError if an OrderWriter is still appending to path.
+    """
+    from order_writer import lock_path, writer_pid    # order_writer imports this module
+    pid = writer_pid(path)
+    if pid is not None:
+        raise RuntimeError(f"{path} is in use by the order writer (process {pid}); stop the app first. "
+                           f"If it isn't running, delete {lock_path(path)}.")
+    parser = TimestampParser()
+    tmp_path = path + ".tmp"
+    rewritten = unparsed = 0
+    with open(path, "r", newline="", encoding="utf-8") as source, \
+            open(tmp_path, "w", newline="", encoding="utf-8") as target:
+        reader = csv.reader(source)
+        writer = csv.writer(target)
+        header = next(reader, None)
+        if header is None:
+            os.remove(tmp_path)
+            return 0, 0
+        writer.writerow(header)
+        index = header.index(column)
+        for row in reader:
+            if len(row) > index:
+                try:
+                    iso = to_iso(parser.parse(row[index]))
+                except ValueError:
+                    unparsed += 1
+                else:
+                    if iso != row[index]:
+                        row[index] = iso
+                        rewritten += 1
+            writer.writerow(row)
+    if backup:
+        shutil.copy2(path, path + ".bak")
+    os.replace(tmp_path, path)
+    return rewritten, unparsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rewrite order timestamps to ISO-8601.")
+    parser.add_argument("path", nargs="?", default="orders.csv")
+    parser.add_argument("--column", default="Date")
+    parser.add_argument("--no-backup", action="store_true", help="don't keep a .bak copy")
+    args = parser.parse_args()
+    try:
+        rewritten, unparsed = migrate_csv(args.path, args.column, backup=not args.no_backup)
+    except RuntimeError as e:
+        sys.exit(str(e))
+    print(f"Rewrote {rewritten} timestamps, {unparsed} could not be parsed.")
+
+
+if __name__ == "__main__":
+    main()
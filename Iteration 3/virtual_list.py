@@ -0,0 +1,107 @@
+# Scrollable list of menu item buttons that only creates widgets for the rows
+# that fit on screen. Scrolling re-labels the same pooled buttons instead of
+# allocating one Button per MenuItem, so a 2,000 item category costs about as
+# much to show as a 10 item one.
+import tkinter as tk
+
+ROW_HEIGHT = 40     # pixels per row, including the gap between buttons
+
+
+class VirtualItemList(tk.Frame):
+    def __init__(self, master, on_select, row_height=ROW_HEIGHT, bg="beige", **kwargs):
+        super().__init__(master, bg=bg, **kwargs)
+        self.on_select = on_select
+        self.row_height = row_height
+        self.bg = bg
+        self.items = []
+        self.top = 0                # scroll position in pixels
+        self.pool = []              # reusable Buttons, one per visible row
+        self.slot_items = []        # MenuItem currently shown by each pooled Button
+
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.viewport = tk.Frame(self, bg=bg)
+        self.viewport.pack(side="left", fill="both", expand=True)
+        self.viewport.bind("<Configure>", lambda event: self._render())
+        self._bind_wheel(self.viewport)
+
+    # ---------------- public ----------------
+    def set_items(self, items):
+        """Show a new list of MenuItems, scrolled back to the top."""
+        self.items = items
+        self.top = 0
+        self._render()
+
+    def scroll_to(self, pixels):
+        max_top = max(0, len(self.items) * self.row_height - self._view_height())
+        self.top = max(0, min(int(pixels), max_top))
+        self._render()
+
+    # ---------------- scrolling ----------------
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(amount) * len(self.items) * self.row_height)
+        elif action == "scroll":
+            step = self._view_height() if unit == "pages" else self.row_height
+            self.scroll_to(self.top + int(amount) * step)
+
+    def _on_wheel(self, event):
+        if getattr(event, "num", None) == 4:
+            direction = -1
+        elif getattr(event, "num", None) == 5:
+            direction = 1
+        else:
+            direction = -1 if event.delta > 0 else 1
+        self.scroll_to(self.top + direction * self.row_height)
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel)     # Windows / macOS
+        widget.bind("<Button-4>", self._on_wheel)       # Linux scroll up
+        widget.bind("<Button-5>", self._on_wheel)       # Linux scroll down
+
+    # ---------------- drawing ----------------
+    def _view_height(self):
+        return max(self.viewport.winfo_height(), self.row_height)
+
+    def _make_button(self, slot):
+        btn = tk.Button(
+            self.viewport,
+            fg="black",
+            highlightthickness=5,
+            highlightbackground=self.bg,
+            command=lambda s=slot: self._select(slot=s)
+        )
+        self._bind_wheel(btn)
+        return btn
+
+    def _select(self, slot):
+        item = self.slot_items[slot]
+        if item is not None:
+            self.on_select(item)
+
+    def _render(self):
+        height = self._view_height()
+        visible = height // self.row_height + 2      # +2 for partly shown rows at the edges
+
+        # Only grow the pool when the window gets taller
+        while len(self.pool) < visible:
+            self.pool.append(self._make_button(len(self.pool)))
+            self.slot_items.append(None)
+
+        first = self.top // self.row_height
+        offset = -(self.top % self.row_height)
+        for slot, btn in enumerate(self.pool):
+            index = first + slot
+            if slot < visible and index < len(self.items):
+                item = self.items[index]
+                if self.slot_items[slot] is not item:
+                    btn.config(text=f"{item.name} - ${item.price:.2f}")
+                    self.slot_items[slot] = item
+                btn.place(x=0, y=offset + slot * self.row_height, relwidth=1, height=self.row_height - 4)
+            else:
+                self.slot_items[slot] = None
+                btn.place_forget()
+
+        total = max(len(self.items) * self.row_height, 1)
+        self.scrollbar.set(self.top / total, min(1.0, (self.top + height) / total))